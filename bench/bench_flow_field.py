@@ -0,0 +1,74 @@
+"""Monster steps per second with a BFS per monster versus one shared flow field.
+
+Usage: python bench/bench_flow_field.py [monsters] [size] [rounds]
+
+Each round the player moves to a neighbouring open cell and every monster takes
+one step toward it, either by running its own breadth-first search or by
+reading the shared FlowField. Both chase over the whole maze (no chase radius).
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from entities.maze import Maze
+from engine.bot import find_path
+from engine.flow_field import FlowField
+
+
+def player_walk(maze, rounds, rng):
+    """A random walk over open cells for the player to follow"""
+    x, y = 1, 1
+    walk = []
+    for _ in range(rounds):
+        moves = [(x + dx, y + dy) for dx, dy in [(0, -1), (1, 0), (0, 1), (-1, 0)] if not maze.is_wall(x + dx, y + dy)]
+        if moves:
+            x, y = rng.choice(moves)
+        walk.append((x, y))
+    return walk
+
+
+def per_monster_bfs(maze, monsters, walk):
+    for player in walk:
+        for i, monster in enumerate(monsters):
+            path = find_path(maze, monster, player)
+            if path:
+                monsters[i] = path[0]
+
+
+def shared_field(maze, monsters, walk, rng):
+    field = FlowField(maze)
+    for player in walk:
+        field.update(*player)
+        for i, monster in enumerate(monsters):
+            step = field.next_step(*monster, rng)
+            if step is not None:
+                monsters[i] = step
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 127
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    maze = Maze(size, size, seed=0)
+    rng = random.Random(0)
+    monsters = [maze.random_empty_cell(rng) for _ in range(count)]
+    walk = player_walk(maze, rounds, rng)
+
+    print(f"{count} monsters on a {size}x{size} maze, {rounds} rounds")
+    print(f"{'mode':>16} {'seconds':>8} {'steps/s':>10}")
+    for mode, run in [
+        ("bfs per monster", lambda m: per_monster_bfs(maze, m, walk)),
+        ("flow field", lambda m: shared_field(maze, m, walk, random.Random(0))),
+    ]:
+        start = time.perf_counter()
+        run(list(monsters))
+        elapsed = time.perf_counter() - start
+        print(f"{mode:>16} {elapsed:>8.3f} {count * rounds / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Time and peak memory of maze generation at increasing sizes.
+
+Usage: python bench/bench_maze_generation.py [--eager] [size ...]
+
+Each size is built lazily, and eagerly up to EAGER_MAX cells a side; pass
+--eager to build the larger sizes eagerly too, which takes many minutes.
+The lazy build generates only the chunks around the start and the goal. The "region" column is the time to
+generate the chunks around a point in the middle of the maze as the player
+approaches it.
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from entities.maze import Maze
+
+SIZES = [31, 67, 101, 131, 251, 501, 1001, 1027, 2001, 2051, 4001]  # 67, 131, 1027 and 2051 end in a 1-cell chunk
+EAGER_MAX = 1027  # Largest size built eagerly by default; each eager build is timed and then traced
+
+
+def measure(build):
+    """Return (seconds, peak MiB); the timed run is separate from the traced one"""
+    random.seed(0)
+    start = time.perf_counter()
+    build()
+    seconds = time.perf_counter() - start
+
+    random.seed(0)
+    tracemalloc.start()
+    build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / (1024 * 1024)
+
+
+def main():
+    args = sys.argv[1:]
+    all_eager = "--eager" in args
+    sizes = [int(size) for size in args if size != "--eager"] or SIZES
+    print(f"{'size':>6} {'eager s':>9} {'eager MiB':>10} {'lazy s':>8} {'lazy MiB':>9} {'region s':>9}")
+    for size in sizes:
+        if all_eager or size <= EAGER_MAX:
+            eager_seconds, eager_peak = measure(lambda: Maze(size, size))
+            eager = f"{eager_seconds:>9.3f} {eager_peak:>10.1f}"
+        else:
+            eager = f"{'-':>9} {'-':>10}"
+        lazy_seconds, lazy_peak = measure(lambda: Maze(size, size, lazy=True))
+
+        maze = Maze(size, size, lazy=True)
+        start = time.perf_counter()
+        maze.ensure_generated(size // 2, size // 2)
+        region_seconds = time.perf_counter() - start
+
+        print(f"{size:>6} {eager} {lazy_seconds:>8.3f} {lazy_peak:>9.1f} {region_seconds:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Sessions per core for the tick server, over the in-process loopback transport.
+
+Usage: python bench/bench_server.py [sessions] [ticks]
+
+First a lock-step check: a few sessions are fed the actions PathBot chose in
+a HeadlessGame with the same seed, one frame per tick, and must stay in step
+with it while their clients' mirrored state matches the server's; a
+malformed frame sent along the way must be dropped without disturbing any
+session. Then the
+load run: every session gets a client task that sends a frame each tick, and
+the server ticks them all at 30 Hz in one event loop. The share of each tick
+spent stepping sessions gives the sessions one core could hold.
+"""
+import asyncio
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from engine.bot import PathBot
+from engine.headless import HeadlessGame
+from engine.replay import state_checksum
+from engine.server import TickServer, GameClient, quantize_player
+
+CHECK_SEEDS = [1, 2, 3, 3]  # The repeated seed shares its stages with the session before it
+ROOMS = 10  # Seeds the load run's sessions are spread over, each a shared run of mazes
+
+
+def bot_run(seed, ticks):
+    """PathBot's actions in a HeadlessGame and the state checksum after each tick"""
+    game = HeadlessGame(seed=seed)
+    actions = []
+    checksums = []
+
+    def recorded():
+        for action in PathBot(game):
+            actions.append(action)
+            yield action
+    game.actions = recorded()
+    while game.outcome is None and game.tick < ticks:
+        game.step()
+        checksums.append(state_checksum(game))
+    return actions, checksums
+
+
+def mirrors(client, session):
+    """True if the client's state is the session's, as precisely as the deltas carry it"""
+    x, y, angle = quantize_player(session.player)
+    return (client.player == (x / 256, y / 256, angle / 65536 * math.tau)
+            and client.monsters == [(monster.x, monster.y) for monster in session.monsters]
+            and client.has_key == session.has_key
+            and client.stage == session.current_stage)
+
+
+def lock_step(ticks):
+    server = TickServer()
+    runs = [bot_run(seed, ticks) for seed in CHECK_SEEDS]
+    clients = [GameClient(server.connect(seed)) for seed in CHECK_SEEDS]
+    sessions = list(server.sessions)
+    for tick in range(ticks):
+        for client, (actions, _) in zip(clients, runs):
+            if tick < len(actions):
+                client.send_input(*actions[tick])
+        if tick == 1:
+            clients[0].connection.send(b"\x01\x02")  # Too short for an INPUT frame
+        server.tick()
+        for client, session, (actions, checksums) in zip(clients, sessions, runs):
+            client.poll()
+            if tick < len(checksums) and state_checksum(session) != checksums[tick]:
+                raise SystemExit(f"session with seed {session.seed} left HeadlessGame at tick {tick}")
+            if session.outcome is None and not mirrors(client, session):
+                raise SystemExit(f"client of seed {session.seed} disagrees with the server at tick {tick}")
+    if sessions[0].dropped_frames != 1:
+        raise SystemExit("the malformed input frame was not dropped")
+    outcomes = [client.outcome for client in clients]
+    print(f"lock-step: {len(clients)} sessions matched HeadlessGame for {ticks} ticks, "
+          f"{len(server.stages.stages)} shared stages, outcomes {outcomes}")
+
+
+async def play(client, actions, tick_rate):
+    for action in actions:
+        client.send_input(*action)
+        if not client.poll():
+            return
+        await asyncio.sleep(1 / tick_rate)
+    client.connection.close()
+
+
+async def load(count, ticks):
+    server = TickServer()
+    actions = bot_run(0, ticks)[0]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    clients = [GameClient(server.connect(i % ROOMS)) for i in range(count)]
+    per_session = (tracemalloc.get_traced_memory()[0] - before) / count
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    tasks = [asyncio.ensure_future(play(client, actions, server.tick_rate)) for client in clients]
+    await server.run(ticks)
+    elapsed = time.perf_counter() - start
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    sent = sum(client.connection.peer.bytes_sent for client in clients)
+    share = server.busy / elapsed
+    print(f"load: {count} sessions, {server.ticks} ticks in {elapsed:.2f}s, {server.skipped_ticks} skipped")
+    print(f"  {server.busy / server.ticks * 1000:.2f}ms per tick, {server.busy / server.ticks / count * 1e6:.1f}us per session tick")
+    print(f"  {share:.0%} of one core busy, about {count / share:.0f} sessions per core at {server.tick_rate} Hz")
+    print(f"  {sent / count / elapsed:.0f} bytes/s sent per session, {per_session / 1024:.1f} KB per session "
+          f"with {len(server.stages.stages)} shared stages")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    lock_step(ticks * 4)
+    asyncio.run(load(count, ticks))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Worst single-frame time across a run of forced trap hits.
+
+Usage: python bench/bench_trap_resets.py [hits] [size] [frames-between-hits]
+
+Every few frames a trap hit is forced and the frame swaps in a new stage the
+way AdventureGame.check_collisions does. The run is repeated with stages
+built synchronously in the frame, prebuilt on a worker thread, and prebuilt
+with pump() a slice per frame, as the WASM build does. pump() only keeps up
+when the frames between hits give it time to finish a stage within its
+per-frame budget; otherwise take() finishes the stage in the frame.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from engine.maze_factory import MazeFactory
+
+FRAME = 1 / 30
+
+
+def run(factory, hits, frames_between_hits):
+    frame_times = []
+    for hit in range(hits * frames_between_hits):
+        start = time.perf_counter()
+        if hit % frames_between_hits == 0:
+            stage = factory.take()
+            stage.maze.set_empty(1, 1)
+        factory.pump()
+        elapsed = time.perf_counter() - start
+        frame_times.append(elapsed)
+        time.sleep(max(0, FRAME - elapsed))  # Idle for the rest of the frame
+    return frame_times
+
+
+def main():
+    hits = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 31
+    frames_between_hits = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    print(f"{hits} trap hits on {size}x{size} mazes, {frames_between_hits} frames apart")
+    print(f"{'mode':>12} {'worst ms':>9} {'mean ms':>8}")
+    for mode, factory in [
+        ("synchronous", MazeFactory(size, size, 10, prebuild=0)),
+        ("thread", MazeFactory(size, size, 10, prebuild=1)),
+        ("pump", MazeFactory(size, size, 10, prebuild=1, threaded=False)),
+    ]:
+        random.seed(0)
+        while not factory.ready and factory.worker is None and factory.prebuild:
+            factory.pump()
+        time.sleep(0.2)  # Let the first stage get built before the run starts
+        frame_times = run(factory, hits, frames_between_hits)
+        worst = max(frame_times) * 1000
+        mean = sum(frame_times) / len(frame_times) * 1000
+        print(f"{mode:>12} {worst:>9.2f} {mean:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
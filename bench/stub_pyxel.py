@@ -0,0 +1,49 @@
+"""A stand-in for the pyxel module whose drawing calls do nothing, for the benchmarks"""
+import sys
+import types
+
+
+class StubImage:
+    def __init__(self, width=0, height=0):
+        self.width = width
+        self.height = height
+
+    def __getattr__(self, name):
+        return _noop
+
+
+def _noop(*args, **kwargs):
+    return 0
+
+
+class StubPyxel(types.ModuleType):
+    """Enough of the pyxel module for main.py and AdventureGame, with every drawing call a no-op"""
+
+    width = 256
+    height = 240
+    mouse_x = 0
+    mouse_y = 0
+    frame_count = 0
+    FONT_WIDTH = 4
+    FONT_HEIGHT = 6
+    Image = StubImage
+
+    def __init__(self):
+        super().__init__("pyxel")
+        self.sounds = [StubImage() for _ in range(64)]
+        self.colors = types.SimpleNamespace(to_list=lambda: [0] * 16, from_list=_noop)
+
+    def run(self, update, draw):
+        """Run a single frame and return, where pyxel.run would loop until the window closes"""
+        update()
+        draw()
+
+    def __getattr__(self, name):
+        if name.isupper():
+            return name  # KEY_* and GAMEPAD1_* constants
+        return _noop
+
+
+def install():
+    """Make `import pyxel` return the stub; call before importing any game module"""
+    sys.modules["pyxel"] = StubPyxel()
@@ -0,0 +1,213 @@
+"""Reproducible benchmarks for the generator, the renderer and the game loop.
+
+Usage: python bench/suite.py [results.json] [--update-baseline]
+
+Every case uses fixed seeds and runs with pyxel replaced by a stub whose
+drawing calls do nothing, so the timings measure this repo's Python rather
+than the window. The startup case launches main.py in a fresh interpreter
+and its check value lists any gameplay module loaded before the title
+screen's first frame, which should be none. Results are written as JSON and compared with
+bench/baseline.json. A case whose fastest run is more than THRESHOLD slower
+than the baseline's, or whose check value changed, is reported and makes the
+script exit with status 1. Timings are machine-specific; run with
+--update-baseline on the machine that does the comparison.
+"""
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+THRESHOLD = 0.25  # Fractional slow-down of the fastest run that counts as a regression
+REPEAT = 10
+
+import stub_pyxel
+stub_pyxel.install()  # Before any game module imports pyxel
+
+from entities.maze import Maze
+from engine.headless import HeadlessGame
+from engine.maze_factory import build_stage
+from engine import raycaster
+from state.game_state import GameState
+try:
+    from engine import batch_raycaster
+except ImportError:
+    batch_raycaster = None
+
+
+def poses(maze, count, seed):
+    """Fixed player positions and headings on open cells"""
+    rng = random.Random(seed)
+    return [(x + rng.random(), y + rng.random(), rng.uniform(0, 6.283)) for x, y in maze.sample_empty_cells(count, rng)]
+
+
+def bench_generate(size):
+    def run():
+        return zlib.crc32(Maze(size, size, seed=size).cells)
+    return run
+
+
+def bench_place_traps(size):
+    def run():
+        stage = build_stage(size, size, size // 3, seed=size)
+        return [(trap.x, trap.y) for trap in stage.traps[:3]] + [stage.key]
+    maze = Maze(size, size, seed=size)  # Built outside the timing; only the placement is timed
+
+    def run_empty():
+        return len(maze.get_empty_cells())
+    return run, run_empty
+
+
+def bench_raycast(cast_columns):
+    maze = Maze(31, 31, seed=1)
+    frames = poses(maze, 60, 1)
+
+    def run():
+        total = 0
+        for x, y, angle in frames:
+            angles = [angle - 0.5 + ray / 256 for ray in range(0, 256, 2)]
+            distances, kinds, shades, layers = cast_columns(maze, x, y, angles, layers=[(29, 29)])
+            total += sum(kinds.tolist())
+        return total
+    return run
+
+
+def bench_move_player():
+    game = HeadlessGame(seed=2)
+    frames = poses(game.maze, 200, 2)
+
+    def run():
+        for x, y, angle in frames:
+            game.player.x, game.player.y, game.player.angle = x, y, angle
+            for _ in range(20):
+                game.move_player(0.1)
+        return round(game.player.x, 6), round(game.player.y, 6)
+    return run
+
+
+def bench_game_loop(ticks):
+    from engine.bot import PathBot
+
+    def run():
+        game = HeadlessGame(seed=3)
+        game.actions = PathBot(game)
+        state = GameState(game)
+        for _ in range(ticks):
+            state.update()
+            if game.outcome is not None:
+                game.new_game()
+        return game.current_stage, int(game.player.x), int(game.player.y)
+    return run
+
+
+def bench_draw_frame():
+    from adventure_game import AdventureGame
+    game = AdventureGame(seed=4)
+    game.start()
+    game.adaptive_quality = False  # Time the default stride rather than whatever it adapts to
+    frames = poses(game.maze, 60, 4)
+
+    def run():
+        for i, (x, y, angle) in enumerate(frames):
+            game.player.x, game.player.y, game.player.angle = x, y, angle
+            game.has_key = i % 2 == 1
+            game.draw()
+        return len(frames)
+    return run
+
+
+# Launches main.py in a fresh interpreter and lists the gameplay modules loaded by its first frame
+STARTUP_SCRIPT = """
+import sys
+sys.path.insert(0, {src!r})
+import stub_pyxel
+stub_pyxel.install()
+import main
+print(sorted(name for name in ("numpy", "engine.simulation", "entities.maze") if name in sys.modules))
+"""
+
+
+def bench_startup():
+    script = STARTUP_SCRIPT.format(src=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+    def run():
+        output = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+        return output.splitlines()[-1]  # Any module listed here was loaded before the title screen showed
+    return run
+
+
+def cases():
+    yield "generate 31", bench_generate(31)
+    yield "generate 101", bench_generate(101)
+    yield "generate 251", bench_generate(251)
+    place_traps, get_empty_cells = bench_place_traps(101)
+    yield "place traps 101", place_traps
+    yield "get_empty_cells 101", get_empty_cells
+    yield "raycast 60 frames", bench_raycast(raycaster.cast_columns)
+    if batch_raycaster is not None:
+        yield "raycast 60 frames numpy", bench_raycast(batch_raycaster.cast_columns)
+    yield "move_player 4000 steps", bench_move_player()
+    yield "game loop 3000 ticks", bench_game_loop(3000)
+    yield "draw 60 frames", bench_draw_frame()
+    yield "startup to first frame", bench_startup()
+
+
+def measure(run):
+    """Return (check value, seconds of each run)"""
+    check = run()  # Warm-up, and the value compared with the baseline
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return check, times
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    output = args[0] if args else "bench_results.json"
+    update_baseline = "--update-baseline" in sys.argv
+
+    baseline = {}
+    if os.path.exists(BASELINE) and not update_baseline:
+        with open(BASELINE) as f:
+            baseline = json.load(f)["cases"]
+
+    results = {}
+    regressions = []
+    print(f"{'case':<26} {'median ms':>10} {'min ms':>9} {'baseline':>9} {'change':>7}")
+    for name, run in cases():
+        check, times = measure(run)
+        result = {"median_ms": statistics.median(times) * 1000, "min_ms": min(times) * 1000,
+                  "runs": len(times), "check": json.loads(json.dumps(check))}
+        results[name] = result
+
+        line = f"{name:<26} {result['median_ms']:>10.2f} {result['min_ms']:>9.2f}"
+        previous = baseline.get(name)
+        if previous:
+            change = result["min_ms"] / previous["min_ms"] - 1  # The minimum is the least noisy
+            line += f" {previous['min_ms']:>9.2f} {change:>+7.0%}"
+            if change > THRESHOLD:
+                regressions.append(f"{name}: {change:+.0%} slower")
+            if previous["check"] != result["check"]:
+                regressions.append(f"{name}: check value changed from {previous['check']} to {result['check']}")
+        print(line)
+
+    report = {"python": sys.version.split()[0], "numpy": batch_raycaster is not None, "cases": results}
+    with open(BASELINE if update_baseline else output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for regression in regressions:
+        print("REGRESSION", regression)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+import atexit
+import itertools
+import time
+
+import pyxel
+from state.game_state import GameState
+from state.clear_state import ClearState
+from state.gameover_state import GameOverState
+from engine.simulation import Simulation, BUTTON_UP, BUTTON_DOWN, BUTTON_LEFT, BUTTON_RIGHT
+from engine.raycaster import HIT_WALL, HIT_OUT
+from engine.profiler import Profiler
+from engine.camera import Camera
+from engine.static_layers import FloorLayer, MinimapLayer
+from engine.quality import AdaptiveQuality
+from engine.sprites import project_sprites
+from entities.monster import Monster
+from entities.trap import Trap
+try:
+    from engine.batch_raycaster import cast_directions  # Casts all columns at once when NumPy is available
+except ImportError:
+    from engine.raycaster import cast_directions
+
+# Rows of the F1 profile overlay
+PROFILE_SECTIONS = ["update_player", "update_monsters", "check_collisions", "draw_maze", "draw_maze.cast",
+                    "draw_maze.goal", "draw_maze.walls", "draw_maze.sprites", "draw_entities"]
+PROFILE_COUNTERS = ["ray_steps", "draw_calls"]
+
+# Billboard (size in cells, color) of each kind of entity in the 3D view
+MONSTER_SPRITE = (0.6, 8)  # Red, as on the minimap
+TRAP_SPRITE = (0.25, 10)  # Yellow
+KEY_SPRITE = (0.3, 14)  # Pink
+
+class AdventureGame(Simulation):
+    """The game in the window main.Launcher opens; built when the first game starts"""
+
+    def __init__(self, seed=None):
+        # Initialize sound data
+        self._init_sounds()
+
+        # Define 16 shades from white to blue in pyxel.colors
+        self.wallcolor = [0x000000] * 16
+        def shade(min, max, step):
+            return int((min*(16-i) + max*i)/16)
+        for i in range(16):
+            self.wallcolor[i] = shade(0xff,0x00,i)*0x10000+shade(0xff,0x00,i)*0x100+0xFF
+        old_colors = pyxel.colors.to_list()
+        pyxel.colors.from_list(old_colors+self.wallcolor)
+        super().__init__(seed)
+        self.profiler = Profiler()
+        self.show_frame_time = False  # Toggled with F1
+        self.quality = AdaptiveQuality()  # Ray stride and distance for the frame rate; F4 toggles adapting
+        self.adaptive_quality = True
+        self.correct_fisheye = False  # Toggled with F3
+        self.recording = False  # Toggled with F5; each new game is then saved as a replay
+        atexit.register(self.stop_recording)  # Closing the window mid-game still ends the replay file properly
+        self.views = {}  # Ray stride -> (Camera, FloorLayer)
+        self.minimap_layer = MinimapLayer(4)  # Same scale as the map in draw_entities
+
+    def _init_sounds(self):
+        """Initialize sound effects"""
+        # Sound 0: Monster movement
+        pyxel.sounds[0].set(
+            "c1e1g1c3",
+            "p",
+            "4444",
+            "n",
+            3
+        )
+
+        # Sound 1: Collision with trap
+        pyxel.sounds[1].set(
+            "f2g2a2b2a2g2f2f2g2a2b2a2g2f2",
+            "p",
+            "44444444444444",
+            "n",
+            5
+        )
+
+        # Sound 2: Key acquisition
+        pyxel.sounds[2].set(
+            "f3b4",
+            "p",
+            "44",
+            "n",
+            10
+        )
+
+    def update(self):
+        if pyxel.btnp(pyxel.KEY_F1):
+            self.show_frame_time = not self.show_frame_time
+        if pyxel.btnp(pyxel.KEY_F2):
+            self.toggle_trace()
+        if pyxel.btnp(pyxel.KEY_F3):
+            self.correct_fisheye = not self.correct_fisheye
+            for camera, _ in self.views.values():
+                camera.correct_fisheye = self.correct_fisheye
+        if pyxel.btnp(pyxel.KEY_F4):
+            self.adaptive_quality = not self.adaptive_quality
+            if not self.adaptive_quality:
+                self.quality = AdaptiveQuality()  # Back to the original stride and distance
+        if pyxel.btnp(pyxel.KEY_F5):
+            self.recording = not self.recording
+            if not self.recording:
+                self.stop_recording()
+        self.profiler.begin("update")
+        self.state.update()
+        self.maze_factory.pump()
+        self.profiler.end("update")
+
+    def draw(self):
+        self.profiler.begin("draw")
+        self.state.draw()
+        self.profiler.end("draw")
+        if self.adaptive_quality and isinstance(self.state, GameState):
+            self.quality.update(self.profiler.current("update") + self.profiler.current("draw"))
+        self.profiler.end_frame()
+
+    def view(self, stride):
+        """Camera and floor layer for a ray stride, built the first time the stride is used"""
+        if stride not in self.views:
+            self.views[stride] = (Camera(pyxel.width // stride, correct_fisheye=self.correct_fisheye),
+                                  FloorLayer(pyxel.width, pyxel.height, stride))
+        return self.views[stride]
+
+    def toggle_trace(self):
+        """Start recording a per-frame trace, or stop and write it to profile_trace.csv/.json"""
+        if self.profiler.trace is None:
+            self.profiler.start_trace()
+        else:
+            trace = self.profiler.stop_trace()
+            self.profiler.export_csv("profile_trace.csv", trace)
+            self.profiler.export_json("profile_trace.json", trace)
+
+    def update_player(self):
+        with self.profiler.section("update_player"):
+            super().update_player()
+
+    def update_monsters(self):
+        with self.profiler.section("update_monsters"):
+            super().update_monsters()
+
+    def check_collisions(self):
+        with self.profiler.section("check_collisions"):
+            super().check_collisions()
+
+
+    def play_sound(self, channel, sound):
+        pyxel.play(channel, sound, loop=False)
+
+    def game_over(self):
+        super().game_over()
+        self.state = GameOverState(self)
+
+    def game_clear(self):
+        super().game_clear()
+        self.state = ClearState(self)
+
+    def start(self):
+        """Start a new game from the title screen"""
+        self.new_game()
+        self.state = GameState(self)
+
+    def new_game(self):
+        super().new_game()
+        if self.recording:
+            self.start_recording(self.open_replay_file())
+
+    def open_replay_file(self):
+        """Create a replay file named for the current time to the millisecond, never reusing a name"""
+        now = time.time()
+        name = time.strftime("replay-%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+        for count in itertools.count():
+            try:
+                return open(f"{name}-{count}.mzr" if count else f"{name}.mzr", "xb")
+            except FileExistsError:
+                pass
+
+    def reset_game(self):
+        super().reset_game()
+        self.profiler.marks.clear()
+        self.mouse_dragging = False  # Track mouse dragging state
+        self.last_mouse_x = pyxel.mouse_x
+        self.last_mouse_y = pyxel.mouse_y
+
+    def check_key_collision(self):
+        had_key = self.has_key
+        super().check_key_collision()
+        if self.has_key and not had_key:
+            self.profiler.mark("before key", "draw_maze")  # Compare draw_maze time with and without the goal layer
+
+    def read_input(self):
+        buttons = 0
+        drag_dx = 0
+
+        # Handle mouse dragging for rotation
+        if pyxel.btn(pyxel.MOUSE_BUTTON_LEFT):
+            if not self.mouse_dragging:
+                self.mouse_dragging = True
+                self.last_mouse_x = pyxel.mouse_x
+                self.last_mouse_y = pyxel.mouse_y
+            else:
+                drag_dx = pyxel.mouse_x - self.last_mouse_x
+                self.last_mouse_x = pyxel.mouse_x
+
+        else:
+            self.last_mouse_x = pyxel.mouse_x
+            self.last_mouse_y = pyxel.mouse_y
+            self.mouse_dragging = False
+
+        if pyxel.btn(pyxel.KEY_UP) or pyxel.btn(pyxel.GAMEPAD1_BUTTON_DPAD_UP):
+            buttons |= BUTTON_UP
+        elif pyxel.btn(pyxel.KEY_DOWN) or pyxel.btn(pyxel.GAMEPAD1_BUTTON_DPAD_DOWN):
+            buttons |= BUTTON_DOWN
+        # Handle forward/backward movement based on vertical mouse drag
+        elif pyxel.btn(pyxel.MOUSE_BUTTON_LEFT):
+            dy = pyxel.mouse_y - self.last_mouse_y
+            if abs(dy) > 4:  # Check if vertical drag exceeds 4 pixels
+                buttons |= BUTTON_UP if dy < 0 else BUTTON_DOWN
+        else:
+            self.last_mouse_y = pyxel.mouse_y  # Reset vertical drag tracking when button is released
+
+        if pyxel.btn(pyxel.KEY_LEFT) or pyxel.btn(pyxel.GAMEPAD1_BUTTON_DPAD_LEFT):
+            buttons |= BUTTON_LEFT
+        if pyxel.btn(pyxel.KEY_RIGHT) or pyxel.btn(pyxel.GAMEPAD1_BUTTON_DPAD_RIGHT):
+            buttons |= BUTTON_RIGHT
+        return buttons, drag_dx
+
+    def draw_maze(self):
+        profiler = self.profiler
+        profiler.begin("draw_maze")
+
+        stride = self.quality.stride
+        max_distance = self.quality.max_distance
+        camera, floor_layer = self.view(stride)
+
+        # Clear the screen and draw the floor from the pre-rendered layer
+        floor_layer.draw()
+        profiler.count("draw_calls")
+
+        # Cast the walls and, once the player has the key, the goal in a single sweep
+        profiler.begin("draw_maze.cast")
+        columns = range(0, pyxel.width, stride)
+        bar = max(1, stride // 2)  # Column width; the gaps between columns show the striped floor
+        dir_xs, dir_ys = camera.directions(*self.player.direction())
+        layers = [(self.goal_x, self.goal_y)] if self.has_key else []
+        distances, kinds, shades, layer_distances = cast_directions(self.maze, self.player.x, self.player.y, dir_xs, dir_ys,
+                                                                    max_distance, layers, profiler)
+        profiler.end("draw_maze.cast")
+
+        # Draw the goal in the 3D maze; it rises above the walls in front of it
+        profiler.begin("draw_maze.goal")
+        lines = 0
+        for goal_distances in layer_distances:
+            for ray, distance in zip(columns, camera.depths(goal_distances)):
+                if distance < max_distance:
+                    ceiling = int(pyxel.height / 2 - pyxel.height / max(distance, 0.1))
+                    floor = pyxel.height - ceiling
+                    pyxel.rect(ray, 0, bar, floor + 1, 8)  # Draw the goal in red
+                    lines += 1
+        profiler.end("draw_maze.goal")
+
+        # Draw the walls in the 3D maze
+        profiler.begin("draw_maze.walls")
+        depths = camera.depths(distances)  # Kept as the z-buffer for the sprites
+        for ray, distance_to_wall, kind, color in zip(columns, depths, kinds.tolist(), shades.tolist()):
+            if kind == HIT_WALL or kind == HIT_OUT:
+                ceiling = int(pyxel.height / 2 - pyxel.height / max(distance_to_wall, 0.1))
+                floor = pyxel.height - ceiling
+                pyxel.rect(ray, ceiling, bar, floor - ceiling + 1, color)  # Draw the wall
+                lines += 1
+        profiler.end("draw_maze.walls")
+
+        # Draw the monsters, traps and key that may be in view, clipped column by column against the walls
+        profiler.begin("draw_maze.sprites")
+        sprites = []
+        for x, y, entity in self.entities_in_view():
+            size, color = MONSTER_SPRITE if isinstance(entity, Monster) else TRAP_SPRITE if isinstance(entity, Trap) else KEY_SPRITE
+            sprites.append((x + 0.5, y + 0.5, size, color))
+        spans = project_sprites(camera, self.player.x, self.player.y, *self.player.direction(), sprites, depths, pyxel.height)
+        for column, top, bottom, color in spans:
+            pyxel.rect(columns[column], top, bar, bottom - top + 1, color)
+        lines += len(spans)
+        profiler.end("draw_maze.sprites")
+        profiler.count("draw_calls", lines)
+        profiler.end("draw_maze")
+
+    def draw_entities(self):
+        self.profiler.begin("draw_entities")
+        map_scale = 4  # Doubled the size of the 2D map
+        player_x = int(self.player.x)
+        player_y = int(self.player.y)
+
+        # Draw a 10x10 area around the player from the pre-rendered minimap
+        x0 = max(0, player_x - 5)
+        y0 = max(0, player_y - 5)
+        self.minimap_layer.draw(self.maze, x0, y0, min(self.maze.width, player_x + 5), min(self.maze.height, player_y + 5),
+                                (x0 - player_x + 5) * map_scale, (y0 - player_y + 5) * map_scale)
+
+        # Draw player position in the center of the 10x10 map
+        pyxel.circ(5 * map_scale, 5 * map_scale, map_scale, 11)
+
+        # Gather the entities in the 10x10 area from the spatial index
+        monsters = []
+        traps = []
+        key = None
+        for x, y, entity in self.entities.window(player_x - 5, player_y - 5, player_x + 5, player_y + 5):
+            if isinstance(entity, Monster):
+                monsters.append((x, y))
+            elif isinstance(entity, Trap):
+                traps.append((x, y))
+            else:
+                key = (x, y)
+
+        # Draw the key if within the 10x10 area and not yet collected
+        if key is not None:
+            pyxel.circ((key[0] - player_x + 5) * map_scale + map_scale // 2, (key[1] - player_y + 5) * map_scale + map_scale // 2, map_scale // 2, 14)  # Pink for the key
+
+        # Draw the goal if within the 10x10 area and the player has the key
+        goal_visible = self.has_key and abs(self.goal_x - player_x) <= 5 and abs(self.goal_y - player_y) <= 5
+        if goal_visible:
+            pyxel.rect((self.goal_x - player_x + 5) * map_scale, (self.goal_y - player_y + 5) * map_scale, map_scale, map_scale, 8)
+
+        # Draw monsters if within the 10x10 area
+        for x, y in monsters:
+            pyxel.circ((x - player_x + 5) * map_scale + map_scale // 2, (y - player_y + 5) * map_scale + map_scale // 2, map_scale // 2, 8)  # Red for monsters
+
+        # Draw traps if within the 10x10 area
+        for x, y in traps:
+            pyxel.circ((x - player_x + 5) * map_scale + map_scale // 2, (y - player_y + 5) * map_scale + map_scale // 2, map_scale // 2, 10)  # Yellow for traps
+
+        # Draw a border around the 2D map
+        border_x = 5 * map_scale - map_scale // 2
+        border_y = 5 * map_scale - map_scale // 2
+        border_size = 10 * map_scale
+        pyxel.rectb(border_x - border_size // 2+2, border_y - border_size // 2+2, border_size, border_size, 7)
+
+        # Draw the key overlay in the bottom-right corner if the player has the key
+        if self.has_key:
+            key_overlay_x = pyxel.width - 16  # Adjust position for a 16x16 key icon
+            key_overlay_y = pyxel.height - 16
+            pyxel.rect(key_overlay_x, key_overlay_y, 16, 16, 14)  # Pink background for the key
+            pyxel.text(key_overlay_x + 4, key_overlay_y + 4, "Key", 7)  # 'K' to represent the key
+
+        # Display the current stage in the top-right corner
+        stage_text = f"Stage: {self.current_stage}/{self.total_stages}"
+        text_width = len(stage_text) * 4  # Approximate width of the text
+        pyxel.text(pyxel.width - text_width - 5, 5, stage_text, 7)
+
+        self.profiler.count("draw_calls", 4 + (key is not None) + goal_visible + len(monsters) + len(traps) + 2 * self.has_key)
+        if self.show_frame_time:
+            self.draw_profile()
+        self.profiler.end("draw_entities")
+
+    def draw_profile(self):
+        """Overlay rolling p50/p95/max of each profiled section and counter"""
+        profiler = self.profiler
+        lines = [f"{'':<17}{'p50':>7}{'p95':>7}{'max':>7}"]
+        for name in PROFILE_SECTIONS:
+            lines.append(f"{name:<17}" + "".join(f"{value:7.2f}" for value in profiler.stats(name)))
+        for name in PROFILE_COUNTERS:
+            lines.append(f"{name:<17}" + "".join(f"{value:7.0f}" for value in profiler.stats(name)))
+
+        # Ray-bound when casting takes longer than issuing the draw calls
+        cast = profiler.stats("draw_maze.cast")[0]
+        drawing = sum(profiler.stats(name)[0] for name in ("draw_maze.goal", "draw_maze.walls", "draw_entities"))
+        lines.append(f"bound: {'rays' if cast > drawing else 'draw calls'}")
+        lines.append(f"stride {self.quality.stride} distance {self.quality.max_distance}"
+                     + (" (adaptive)" if self.adaptive_quality else ""))
+        if "before key" in profiler.marks:
+            lines.append(f"draw_maze before key: {profiler.marks['before key']:.2f}ms")
+        if profiler.trace is not None:
+            lines.append(f"tracing {len(profiler.trace)} frames (F2 to save)")
+
+        for i, line in enumerate(lines):
+            pyxel.text(pyxel.width - len(line) * 4 - 5, 13 + i * 7, line, 7)
+        profiler.count("draw_calls", len(lines))
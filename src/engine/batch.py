@@ -0,0 +1,97 @@
+from .bot import PathBot
+from .headless import HeadlessGame
+from .maze_cache import MazeCache
+
+
+class RecordingGame(HeadlessGame):
+    """A HeadlessGame that keeps per-stage statistics while it plays"""
+
+    def __init__(self, actions=(), seed=None, **kwargs):
+        self.stages = []
+        super().__init__(actions, seed, **kwargs)
+
+    def reset_game(self):
+        super().reset_game()
+        if not self.stages or self.stages[-1]["stage"] != self.current_stage:
+            self.stages.append({"stage": self.current_stage, "start_tick": self.tick, "steps_to_key": None,
+                                "steps_to_goal": None, "trap_resets": 0, "monster_deaths": 0, "cleared": False})
+
+    def check_key_collision(self):
+        had_key = self.has_key
+        super().check_key_collision()
+        if self.has_key and not had_key:
+            stage = self.stages[-1]
+            stage["steps_to_key"] = self.tick - stage["start_tick"]
+
+    def check_trap_collision(self):
+        hit = super().check_trap_collision()
+        if hit:
+            self.stages[-1]["trap_resets"] += 1
+        return hit
+
+    def check_collisions(self):
+        stage = self.stages[-1]
+        super().check_collisions()
+        if self.current_stage > stage["stage"] or self.outcome == "clear":
+            stage["steps_to_goal"] = self.tick - stage["start_tick"]
+            stage["cleared"] = True
+
+    def game_over(self):
+        super().game_over()
+        self.stages[-1]["monster_deaths"] += 1
+
+
+_cache = None  # One maze cache per worker process
+
+
+def play_game(seed, max_ticks=20000):
+    """Play one seeded game with a PathBot and return its result as a JSON-ready dict"""
+    global _cache
+    if _cache is None:
+        _cache = MazeCache(capacity=64)
+    game = RecordingGame(seed=seed, cache=_cache)
+    game.actions = PathBot(game)
+    outcome = game.run(max_ticks) or "timeout"
+    return {"seed": seed, "outcome": outcome, "ticks": game.tick, "stages": game.stages}
+
+
+class BatchStats:
+    """Running per-stage aggregates over game results, so results need not be kept"""
+
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.outcomes = {}
+        self.stages = {}
+
+    def add(self, result):
+        self.games += 1
+        self.wins += result["outcome"] == "clear"
+        self.outcomes[result["outcome"]] = self.outcomes.get(result["outcome"], 0) + 1
+        for stage in result["stages"]:
+            totals = self.stages.setdefault(stage["stage"], {
+                "played": 0, "cleared": 0, "keys": 0, "steps_to_key": 0, "steps_to_goal": 0,
+                "trap_resets": 0, "monster_deaths": 0})
+            totals["played"] += 1
+            totals["trap_resets"] += stage["trap_resets"]
+            totals["monster_deaths"] += stage["monster_deaths"]
+            if stage["steps_to_key"] is not None:
+                totals["keys"] += 1
+                totals["steps_to_key"] += stage["steps_to_key"]
+            if stage["cleared"]:
+                totals["cleared"] += 1
+                totals["steps_to_goal"] += stage["steps_to_goal"]
+
+    def summary(self):
+        stages = {}
+        for number, totals in sorted(self.stages.items()):
+            stages[number] = {
+                "played": totals["played"],
+                "clear_rate": totals["cleared"] / totals["played"],
+                "mean_steps_to_key": totals["steps_to_key"] / totals["keys"] if totals["keys"] else None,
+                "mean_steps_to_goal": totals["steps_to_goal"] / totals["cleared"] if totals["cleared"] else None,
+                "trap_resets_per_play": totals["trap_resets"] / totals["played"],
+                "monster_deaths": totals["monster_deaths"],
+            }
+        return {"games": self.games, "win_rate": self.wins / self.games if self.games else 0,
+                "outcomes": self.outcomes, "stages": stages}
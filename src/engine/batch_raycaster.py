@@ -0,0 +1,105 @@
+"""NumPy backend for cast_columns: every column of a frame is traversed in lockstep
+over a zero-copy view of Maze.cells.
+
+Importing this module raises ImportError when NumPy is unavailable, in which
+case callers fall back to engine.raycaster.cast_columns.
+"""
+import numpy as np
+
+from entities.maze import WALL
+
+from .raycaster import HIT_NONE, HIT_WALL, HIT_GOAL, HIT_OUT, OUT_OF_BOUNDS_DISTANCE, GOAL_COLOR, FAR_DISTANCE
+
+
+def _enter_cell(x, y, dir_x, dir_y, cell_x, cell_y, max_distance):
+    """Vectorized engine.raycaster.enter_cell"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t1 = (cell_x - x) / dir_x
+        t2 = (cell_x + 1 - x) / dir_x
+        near_x = np.where(dir_x != 0, np.minimum(t1, t2), np.where((cell_x <= x) & (x < cell_x + 1), -np.inf, np.inf))
+        far_x = np.where(dir_x != 0, np.maximum(t1, t2), np.inf)
+        t1 = (cell_y - y) / dir_y
+        t2 = (cell_y + 1 - y) / dir_y
+        near_y = np.where(dir_y != 0, np.minimum(t1, t2), np.where((cell_y <= y) & (y < cell_y + 1), -np.inf, np.inf))
+        far_y = np.where(dir_y != 0, np.maximum(t1, t2), np.inf)
+    near = np.maximum(near_x, near_y)
+    far = np.minimum(far_x, far_y)
+    missed = (near >= far) | (near <= 0) | (near >= max_distance)
+    return np.where(missed, np.inf, near)
+
+
+def cast_columns(maze, x, y, angles, max_distance=30, layers=(), counters=None):
+    """Cast one ray per angle with the same DDA walk as engine.raycaster.cast_ray.
+
+    Returns (distances, hit types, shade indices, layer distances) as NumPy
+    arrays, with one array of entry distances per layer cell. counters counts
+    the cells visited as "ray_steps", as engine.raycaster.cast_columns does.
+    """
+    angles = np.asarray(angles, dtype=np.float64)
+    return cast_directions(maze, x, y, np.cos(angles), np.sin(angles), max_distance, layers, counters)
+
+
+def cast_directions(maze, x, y, dir_xs, dir_ys, max_distance=30, layers=(), counters=None):
+    """cast_columns for rays given as unit direction vectors, such as from engine.camera.Camera"""
+    width = maze.width
+    height = maze.height
+    grid = np.frombuffer(maze.buffer, dtype=np.uint8).reshape(height, width)
+    dir_x = np.asarray(dir_xs, dtype=np.float64)
+    dir_y = np.asarray(dir_ys, dtype=np.float64)
+    count = len(dir_x)
+
+    with np.errstate(divide="ignore"):
+        delta_x = np.abs(1 / dir_x)
+        delta_y = np.abs(1 / dir_y)
+
+    start_x = int(x)
+    start_y = int(y)
+    map_x = np.full(count, start_x, dtype=np.int64)
+    map_y = np.full(count, start_y, dtype=np.int64)
+    step_x = np.where(dir_x < 0, -1, 1)
+    step_y = np.where(dir_y < 0, -1, 1)
+    with np.errstate(invalid="ignore"):
+        side_x = np.where(dir_x < 0, (x - start_x) * delta_x, (start_x + 1 - x) * delta_x)
+        side_y = np.where(dir_y < 0, (y - start_y) * delta_y, (start_y + 1 - y) * delta_y)
+
+    distances = np.full(count, float(max_distance))
+    kinds = np.full(count, HIT_NONE, dtype=np.int8)
+    active = np.ones(count, dtype=bool)
+    steps = 0
+
+    while active.any():
+        steps += int(np.count_nonzero(active))
+        use_x = side_x < side_y
+        distance = np.where(use_x, side_x, side_y)
+        advance_x = active & use_x
+        advance_y = active & ~use_x
+        map_x += step_x * advance_x
+        map_y += step_y * advance_y
+        side_x = np.where(advance_x, side_x + delta_x, side_x)
+        side_y = np.where(advance_y, side_y + delta_y, side_y)
+
+        too_far = active & (distance >= max_distance)
+        active &= ~too_far
+
+        out = active & ((map_x < 0) | (map_x >= width) | (map_y < 0) | (map_y >= height))
+        distances[out] = OUT_OF_BOUNDS_DISTANCE
+        kinds[out] = HIT_OUT
+        active &= ~out
+
+        cells = grid[np.clip(map_y, 0, height - 1), np.clip(map_x, 0, width - 1)]
+        wall = active & ((cells & WALL) != 0)
+        distances[wall] = distance[wall]
+        kinds[wall] = HIT_WALL
+        active &= ~wall
+
+    layer_distances = [_enter_cell(x, y, dir_x, dir_y, cell_x, cell_y, max_distance) for cell_x, cell_y in layers]
+    if layer_distances:
+        kinds[np.minimum.reduce(layer_distances) < distances] = HIT_GOAL
+
+    if counters is not None:
+        counters.count("ray_steps", steps)
+
+    walls = (kinds == HIT_WALL) | (kinds == HIT_OUT)
+    wall_shades = 16 + (np.minimum(distances, FAR_DISTANCE) / FAR_DISTANCE * 16).astype(np.uint8)
+    shades = np.where(walls, wall_shades, np.where(kinds == HIT_GOAL, GOAL_COLOR, 0)).astype(np.uint8)
+    return distances, kinds, shades, layer_distances
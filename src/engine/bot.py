@@ -0,0 +1,89 @@
+import math
+from array import array
+from collections import deque
+
+from entities.maze import WALL, TRAP
+from .simulation import BUTTON_UP, BUTTON_LEFT, BUTTON_RIGHT, DRAG_TURN
+
+TURN_IN_PLACE = 0.3  # Radians off course before the bot stops to turn instead of walking
+
+
+def find_path(maze, start, target, blocked=(), avoid=WALL | TRAP):
+    """Breadth-first search over open cells; returns the cells after start up to target, or None.
+
+    Cells with any of the avoid flags (walls and traps by default) are never
+    entered. Cells in blocked (such as monster positions) are avoided as well.
+    """
+    width = maze.width
+    cells = maze.cells
+    start_index = start[1] * width + start[0]
+    target_index = target[1] * width + target[0]
+    avoided = {y * width + x for x, y in blocked}
+    parent = array("i", [-1]) * (width * maze.height)
+    parent[start_index] = start_index
+    queue = deque([start_index])
+    while queue:
+        i = queue.popleft()
+        if i == target_index:
+            path = []
+            while i != start_index:
+                path.append((i % width, i // width))
+                i = parent[i]
+            path.reverse()
+            return path
+        for n in (i - width, i + 1, i + width, i - 1):
+            if parent[n] < 0 and not cells[n] & avoid and n not in avoided:
+                parent[n] = i
+                queue.append(n)
+    return None
+
+
+class PathBot:
+    """Plays a Simulation by walking the shortest safe path to the key and then the goal.
+
+    Iterate it to get one (buttons, drag_dx) action per tick, e.g. by assigning it
+    to HeadlessGame.actions.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.path = deque()
+        self.plan = None  # (maze, target, cell) the current path was planned for
+
+    def __iter__(self):
+        return self
+
+    def _replan(self, cell, target):
+        game = self.game
+        monsters = [(monster.x, monster.y) for monster in game.monsters]
+        path = find_path(game.maze, cell, target, monsters)
+        if path is None:
+            path = find_path(game.maze, cell, target)  # No way around the monsters; risk it
+        if path is None:
+            path = find_path(game.maze, cell, target, avoid=WALL)  # Every way is through a trap; take the reset
+        self.path = deque(path or ())
+        self.plan = (game.maze, target, cell)
+
+    def __next__(self):
+        game = self.game
+        player = game.player
+        cell = (int(player.x), int(player.y))
+        target = (game.goal_x, game.goal_y) if game.has_key else game.key
+
+        while self.path and self.path[0] == cell:
+            self.path.popleft()
+        if self.path:
+            replan = self.plan[:2] != (game.maze, target) or abs(self.path[0][0] - cell[0]) + abs(self.path[0][1] - cell[1]) != 1
+        else:
+            replan = self.plan != (game.maze, target, cell)  # Unreachable targets are retried only after moving
+        if replan or game.monster_move_timer == 1:
+            self._replan(cell, target)  # New stage, new target, monsters just moved, or knocked off the path
+        if not self.path:
+            return 0, 0
+
+        next_x, next_y = self.path[0]
+        heading = math.atan2(next_y + 0.5 - player.y, next_x + 0.5 - player.x)
+        delta = (heading - player.angle + math.pi) % (2 * math.pi) - math.pi
+        if abs(delta) > TURN_IN_PLACE:
+            return (BUTTON_RIGHT if delta > 0 else BUTTON_LEFT), 0
+        return BUTTON_UP, round(delta / DRAG_TURN)
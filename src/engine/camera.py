@@ -0,0 +1,34 @@
+import math
+from array import array
+
+
+class Camera:
+    """Ray directions for a fixed set of screen columns.
+
+    The angle offset of each column from the centre of view never changes, so
+    its cos/sin are computed once here. A frame's rays are those offsets
+    rotated by the player's heading, which costs one cos/sin per frame (from
+    Player.direction) however many columns there are. The cosines double as
+    the fish-eye correction factors.
+    """
+
+    def __init__(self, columns, fov=1.0, correct_fisheye=False):
+        self.columns = columns
+        self.fov = fov
+        self.correct_fisheye = correct_fisheye
+        offsets = [fov * (column / columns - 0.5) for column in range(columns)]
+        self.offset_cos = array("d", [math.cos(offset) for offset in offsets])
+        self.offset_sin = array("d", [math.sin(offset) for offset in offsets])
+        self._offsets = list(zip(self.offset_cos, self.offset_sin))
+
+    def directions(self, cos_angle, sin_angle):
+        """Return (dir_xs, dir_ys) for a view heading with the given cos and sin"""
+        return (array("d", [cos_angle * c - sin_angle * s for c, s in self._offsets]),
+                array("d", [sin_angle * c + cos_angle * s for c, s in self._offsets]))
+
+    def depths(self, distances):
+        """Distances along each ray as a list, or along the view direction with fish-eye correction"""
+        distances = distances.tolist()
+        if self.correct_fisheye:
+            return [distance * c for distance, c in zip(distances, self.offset_cos)]
+        return distances
@@ -0,0 +1,75 @@
+from array import array
+from collections import deque
+
+from entities.maze import WALL, SparseIndex
+
+UNREACHED = -1
+
+
+class FlowField:
+    """BFS distance map toward the player over the open cells of a maze.
+
+    One field is shared by every monster, so moving a monster is a constant-time
+    look at its neighbours' distances. The field is only rebuilt when the player
+    changes cell or the walls change. A rebuild resets just the cells the
+    previous search reached, and the search stops at max_distance, so the cost
+    is bounded by the area around the player rather than by the maze size.
+    """
+
+    def __init__(self, maze, max_distance=None):
+        self.maze = maze
+        self.max_distance = max_distance
+        # Only the searched area is stored for lazily generated mazes, which can be too large for a full array
+        self.distances = SparseIndex() if maze.lazy else array("i", [UNREACHED]) * (maze.width * maze.height)
+        self.reached = array("i")  # Cells the last search assigned a distance to
+        self.origin = None
+        self.version = None
+
+    def update(self, x, y):
+        """Rebuild toward (x, y) if the player or the walls moved; returns True if it rebuilt"""
+        if (x, y) == self.origin and self.version == self.maze.version:
+            return False
+        self.origin = (x, y)
+        self.version = self.maze.version
+
+        distances = self.distances
+        if isinstance(distances, SparseIndex):
+            distances.clear()
+        else:
+            for i in self.reached:
+                distances[i] = UNREACHED
+        self.reached = array("i")
+
+        width = self.maze.width
+        cells = self.maze.cells
+        limit = self.max_distance if self.max_distance is not None else self.maze.width * self.maze.height
+        start = y * width + x
+        distances[start] = 0
+        self.reached.append(start)
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            distance = distances[i] + 1
+            if distance > limit:
+                continue
+            for n in (i - width, i + 1, i + width, i - 1):
+                if distances[n] == UNREACHED and not cells[n] & WALL:
+                    distances[n] = distance
+                    self.reached.append(n)
+                    queue.append(n)
+        return True
+
+    def distance(self, x, y):
+        """Steps from (x, y) to the player, or UNREACHED when out of range"""
+        return self.distances[y * self.maze.width + x]
+
+    def next_step(self, x, y, rng):
+        """Return a neighbouring cell one step closer to the player, or None when out of range"""
+        width = self.maze.width
+        distances = self.distances
+        here = distances[y * width + x]
+        if here <= 0:
+            return None
+        steps = [(x + dx, y + dy) for dx, dy in [(0, -1), (1, 0), (0, 1), (-1, 0)]
+                 if distances[(y + dy) * width + x + dx] == here - 1]
+        return rng.choice(steps) if steps else None
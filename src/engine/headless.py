@@ -0,0 +1,29 @@
+from .simulation import Simulation
+
+
+class HeadlessGame(Simulation):
+    """Runs the game rules from a per-tick action stream, with no window, sound or drawing.
+
+    Each action is a (buttons, drag_dx) pair, the same shape as
+    Simulation.read_input. A bare int is taken as buttons with no drag. The
+    stream may be a list, a generator or any other iterable; once it runs out
+    the player stands still.
+    """
+
+    def __init__(self, actions=(), seed=None, **kwargs):
+        kwargs.setdefault("prebuild", 0)  # Build stages in-line; there is no frame budget to protect
+        super().__init__(seed, **kwargs)
+        self.actions = iter(actions)
+        self.new_game()
+
+    def read_input(self):
+        action = next(self.actions, 0)
+        if isinstance(action, int):
+            return action, 0
+        return action
+
+    def run(self, max_ticks):
+        """Step until the game ends or max_ticks have passed; returns the outcome or None"""
+        while self.outcome is None and self.tick < max_ticks:
+            self.step()
+        return self.outcome
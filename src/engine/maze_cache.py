@@ -0,0 +1,105 @@
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+from entities.maze import Maze
+from entities.maze_generator import GENERATOR_VERSION
+
+MAGIC = b"MZC1"
+HEADER = struct.Struct("<4sIIIIH")  # magic, generator version, width, height, seed, trap count
+
+
+class CachedStage:
+    """The compact grid and entity placements of a generated stage"""
+
+    def __init__(self, width, height, seed, cells, traps, key):
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.cells = bytes(cells)
+        self.traps = tuple(traps)
+        self.key = key
+
+    def to_bytes(self):
+        placements = [coordinate for cell in self.traps + (self.key,) for coordinate in cell]
+        return (HEADER.pack(MAGIC, GENERATOR_VERSION, self.width, self.height, self.seed, len(self.traps))
+                + self.cells
+                + struct.pack(f"<{len(placements)}I", *placements))
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, width, height, seed, trap_count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != GENERATOR_VERSION:
+            return None
+        offset = HEADER.size + width * height
+        placements = struct.unpack_from(f"<{(trap_count + 1) * 2}I", data, offset)
+        cells = [(placements[i], placements[i + 1]) for i in range(0, len(placements), 2)]
+        return cls(width, height, seed, data[HEADER.size:offset], cells[:-1], cells[-1])
+
+    def to_maze(self):
+        return Maze(self.width, self.height, self.seed, cells=self.cells)
+
+
+class MazeCache:
+    """In-memory LRU of generated stages, optionally backed by a directory on disk.
+
+    Entries are keyed by (width, height, seed, trap count, generator version), so a
+    known seed is restored instead of generated again.
+    """
+
+    def __init__(self, capacity=16, directory=None):
+        self.capacity = capacity
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _key(self, width, height, seed, num_traps):
+        return width, height, seed, num_traps, GENERATOR_VERSION
+
+    def _path(self, key):
+        width, height, seed, num_traps, version = key
+        return os.path.join(self.directory, f"{width}x{height}-{seed}-t{num_traps}-v{version}.maze")
+
+    def get(self, width, height, seed, num_traps):
+        key = self._key(width, height, seed, num_traps)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        if self.directory is not None:
+            try:
+                with open(self._path(key), "rb") as f:
+                    entry = CachedStage.from_bytes(f.read())
+            except (OSError, struct.error):
+                entry = None
+            if entry is not None:
+                self._remember(key, entry)
+                with self.lock:
+                    self.hits += 1
+                return entry
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, num_traps, entry):
+        key = self._key(entry.width, entry.height, entry.seed, num_traps)
+        self._remember(key, entry)
+        if self.directory is not None:
+            path = self._path(key)
+            with open(path + ".tmp", "wb") as f:
+                f.write(entry.to_bytes())
+            os.replace(path + ".tmp", path)
+
+    def _remember(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
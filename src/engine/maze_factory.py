@@ -0,0 +1,159 @@
+import random
+import threading
+import time
+from collections import deque
+
+from entities.maze import Maze, TRAP, KEY
+from entities.trap import Trap
+from .maze_cache import CachedStage
+
+PLAY_SEED_SALT = 0x5EED  # Keeps the gameplay random stream apart from the generation stream
+PUMP_BUDGET = 0.001  # Seconds of stage building pump() may spend in one frame
+
+
+class Stage:
+    """A maze with its traps and key already placed"""
+
+    def __init__(self, maze, traps, key):
+        self.maze = maze
+        self.traps = traps
+        self.key = key
+        self.random = random.Random(maze.seed ^ PLAY_SEED_SALT)  # For monster moves during play
+
+
+def build_stage(width, height, num_traps, seed=None, cache=None, lazy=False):
+    """Build a maze and place its traps and key.
+
+    A lazy maze only has the chunks around the start and the goal at first,
+    so the traps and key are placed in those; the rest is generated as the
+    player explores. Lazy stages are not cached, since their cells are not
+    complete yet.
+    """
+    steps = build_stage_steps(width, height, num_traps, seed, cache, lazy)
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+
+def build_stage_steps(width, height, num_traps, seed=None, cache=None, lazy=False):
+    """build_stage as a generator that yields between slices of the work and returns the Stage"""
+    if lazy:
+        cache = None
+    if cache is not None and seed is not None:
+        cached = cache.get(width, height, seed, num_traps)
+        if cached is not None:
+            return Stage(cached.to_maze(), [Trap(x, y) for x, y in cached.traps], cached.key)
+
+    maze = Maze(width, height, seed, lazy=lazy, deferred=True)
+    if not lazy:
+        yield from maze.generate_steps()
+    trap_cells = maze.sample_empty_cells(num_traps)
+    for trap_pos in trap_cells:
+        maze.set_flag(*trap_pos, TRAP)
+    key = maze.random_empty_cell() or (1, 1)
+    maze.set_flag(*key, KEY)
+    if cache is not None:
+        cache.put(num_traps, CachedStage(width, height, maze.seed, maze.cells, trap_cells, key))
+    return Stage(maze, [Trap(x, y) for x, y in trap_cells], key)
+
+
+class MazeFactory:
+    """Keeps the next stages built ahead of time so a reset only swaps references.
+
+    Stages are built on a worker thread. Where threads cannot be started (the
+    WASM build), call pump() once per frame instead: it builds the next stage
+    a slice at a time within a small per-frame budget. Each stage's seed is drawn from a sequence seeded by reseed(), so
+    the same seed always yields the same run of stages.
+    """
+
+    def __init__(self, width, height, num_traps, prebuild=1, threaded=True, seed=None, cache=None, lazy=False):
+        self.width = width
+        self.height = height
+        self.num_traps = num_traps
+        self.prebuild = prebuild
+        self.cache = cache
+        self.lazy = lazy  # Build lazily generated mazes, for sizes too large to generate up front
+        self.ready = deque()
+        self.condition = threading.Condition()
+        self.building = False
+        self.generation = 0  # Bumped by reseed() so stages from the old sequence are dropped
+        self.pumping = None  # build_stage_steps() of the stage pump() is part way through
+        self.reseed(seed)
+        self.worker = None
+        if threaded and prebuild > 0:
+            worker = threading.Thread(target=self._work, daemon=True)
+            try:
+                worker.start()
+                self.worker = worker
+            except RuntimeError:
+                pass  # No thread support; fall back to pump()
+
+    def reseed(self, seed=None):
+        """Restart the stage sequence; a seed of None starts a fresh random sequence"""
+        with self.condition:
+            self.seeds = random.Random(seed)
+            self.generation += 1
+            self.ready.clear()
+            self.pumping = None
+            self.condition.notify_all()
+
+    def _build(self, seed):
+        return build_stage(self.width, self.height, self.num_traps, seed, self.cache, self.lazy)
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while len(self.ready) >= self.prebuild:
+                    self.condition.wait()
+                self.building = True
+                seed, generation = self.seeds.getrandbits(32), self.generation
+            stage = None
+            try:
+                stage = self._build(seed)
+            except Exception as error:
+                stage = error  # Raised by take() on the game's thread instead of killing the worker
+            finally:
+                with self.condition:
+                    self.building = False
+                    if stage is not None and generation == self.generation:
+                        self.ready.append(stage)
+                    self.condition.notify_all()
+
+    def take(self):
+        """Return the next stage, building it now if it is not ready yet"""
+        with self.condition:
+            while not self.ready and self.building:
+                self.condition.wait()  # The next stage in the sequence is almost done
+            if self.ready:
+                stage = self.ready.popleft()
+                self.condition.notify_all()
+                if isinstance(stage, Exception):
+                    raise stage
+                return stage
+            if self.pumping is not None:
+                return self._finish_pumping()  # Its seed is already drawn, so finish it now
+            seed = self.seeds.getrandbits(32)
+        return self._build(seed)
+
+    def pump(self, budget=PUMP_BUDGET):
+        """Build the next stage for up to budget seconds when running without a worker thread"""
+        if self.worker is not None or len(self.ready) >= self.prebuild:
+            return
+        if self.pumping is None:
+            self.pumping = build_stage_steps(self.width, self.height, self.num_traps, self.seeds.getrandbits(32),
+                                             self.cache, self.lazy)
+        stage = self._finish_pumping(time.perf_counter() + budget)
+        if stage is not None:
+            self.ready.append(stage)
+
+    def _finish_pumping(self, deadline=None):
+        """Run the pumped build until it completes or the deadline passes; returns the Stage once done"""
+        try:
+            while deadline is None or time.perf_counter() < deadline:
+                next(self.pumping)
+        except StopIteration as done:
+            self.pumping = None
+            return done.value
+        return None
@@ -0,0 +1,92 @@
+import csv
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Profiler:
+    """Per-section frame timings and per-frame counters with rolling percentiles.
+
+    Sections are timed with begin()/end() or the section() context manager and
+    summed over a frame; counters such as ray steps and draw calls are added to
+    with count(). end_frame() pushes the frame's values into a rolling window
+    per name, and, while a trace is being recorded, appends them as one row
+    that export_csv() and export_json() write out.
+    """
+
+    def __init__(self, window=120):
+        self.window = window
+        self.samples = {}  # name -> deque of the last window frames, milliseconds for sections
+        self.marks = {}  # label -> p50 of a section when mark() was called
+        self.trace = None  # List of per-frame rows while recording
+        self.frame = 0
+        self._current = {}
+        self._started = {}
+
+    def begin(self, name):
+        self._started[name] = time.perf_counter()
+
+    def end(self, name):
+        elapsed = (time.perf_counter() - self._started.pop(name)) * 1000
+        self._current[name] = self._current.get(name, 0) + elapsed
+
+    @contextmanager
+    def section(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def count(self, name, amount=1):
+        self._current[name] = self._current.get(name, 0) + amount
+
+    def current(self, name):
+        """The value of a section or counter so far in this frame"""
+        return self._current.get(name, 0)
+
+    def end_frame(self):
+        for name, value in self._current.items():
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+            samples.append(value)
+        if self.trace is not None:
+            row = {"frame": self.frame}
+            row.update(self._current)
+            self.trace.append(row)
+        self._current = {}
+        self.frame += 1
+
+    def stats(self, name):
+        """Return (p50, p95, max) over the rolling window, or zeros before any sample"""
+        samples = sorted(self.samples.get(name, ()))
+        if not samples:
+            return 0, 0, 0
+        last = len(samples) - 1
+        return samples[last // 2], samples[round(last * 0.95)], samples[last]
+
+    def mark(self, label, name):
+        """Remember the current p50 of a section so it can be compared with later frames"""
+        self.marks[label] = self.stats(name)[0]
+        self.samples.pop(name, None)
+
+    def start_trace(self):
+        self.trace = []
+
+    def stop_trace(self):
+        trace, self.trace = self.trace, None
+        return trace or []
+
+    def export_csv(self, path, trace):
+        names = sorted({name for row in trace for name in row} - {"frame"})
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, ["frame"] + names, restval=0)
+            writer.writeheader()
+            writer.writerows(trace)
+
+    def export_json(self, path, trace):
+        summary = {name: dict(zip(("p50", "p95", "max"), self.stats(name))) for name in sorted(self.samples)}
+        with open(path, "w") as f:
+            json.dump({"summary": summary, "frames": trace}, f)
@@ -0,0 +1,57 @@
+from collections import deque
+
+# (column stride, max ray distance) from finest to cheapest. The distance never
+# drops below raycaster.FAR_DISTANCE, so the far-fade shading is unchanged.
+LEVELS = [(1, 30), (2, 30), (2, 16), (4, 16), (4, 10)]
+DEFAULT_LEVEL = 1  # Stride 2, the original renderer
+
+DOWNGRADE_LOAD = 0.9  # Drop a level when frames use more than this share of the budget
+UPGRADE_LOAD = 0.5  # Raise a level only when frames use less than this share
+
+
+class AdaptiveQuality:
+    """Picks a render level that keeps frame work time within a target frame rate.
+
+    Frame times are averaged over a window. Going down a level needs a full
+    window over DOWNGRADE_LOAD of the budget; going back up needs twice as
+    long under UPGRADE_LOAD. The gap between the two loads, the longer wait
+    to upgrade, and the window being cleared after every change keep the
+    level from flickering between two settings.
+    """
+
+    def __init__(self, fps=30, window=30, level=DEFAULT_LEVEL):
+        self.budget = 1000 / fps
+        self.window = window
+        self.level = level
+        self.samples = deque(maxlen=window)
+        self.cheap_frames = 0  # Consecutive full windows under UPGRADE_LOAD
+
+    @property
+    def stride(self):
+        return LEVELS[self.level][0]
+
+    @property
+    def max_distance(self):
+        return LEVELS[self.level][1]
+
+    def update(self, frame_ms):
+        """Record one frame's work time; returns True when the level changed"""
+        self.samples.append(frame_ms)
+        if len(self.samples) < self.window:
+            return False
+        load = sum(self.samples) / len(self.samples) / self.budget
+        if load > DOWNGRADE_LOAD and self.level < len(LEVELS) - 1:
+            return self._set_level(self.level + 1)
+        if load < UPGRADE_LOAD and self.level > 0:
+            self.cheap_frames += 1
+            if self.cheap_frames >= self.window:
+                return self._set_level(self.level - 1)
+        else:
+            self.cheap_frames = 0
+        return False
+
+    def _set_level(self, level):
+        self.level = level
+        self.samples.clear()
+        self.cheap_frames = 0
+        return True
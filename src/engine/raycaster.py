@@ -0,0 +1,204 @@
+import math
+from array import array
+
+from entities.maze import WALL
+
+# What a ray stopped on
+HIT_NONE = 0
+HIT_WALL = 1
+HIT_GOAL = 2  # A layer cell such as the goal is in front of the wall
+HIT_OUT = 3
+
+# Which grid line the ray crossed to enter the hit cell
+SIDE_X = 0  # a vertical line (x boundary)
+SIDE_Y = 1  # a horizontal line (y boundary)
+
+OUT_OF_BOUNDS_DISTANCE = 10  # Distance the old marcher reported for rays leaving the maze
+
+GOAL_COLOR = 8  # Red for the goal
+FAR_DISTANCE = 5  # Walls at or beyond this distance get the darkest shade
+
+
+class RayHit:
+    def __init__(self, kind, distance, side, cell_x, cell_y, steps, layers=()):
+        self.kind = kind
+        self.distance = distance
+        self.side = side
+        self.cell_x = cell_x
+        self.cell_y = cell_y
+        self.steps = steps  # Number of grid cells visited
+        self.layers = layers  # Entry distance into each layer cell, or math.inf when the ray misses it
+
+
+def _setup(x, y, dir_x, dir_y):
+    """Return the DDA state for a ray starting at (x, y)"""
+    map_x = int(x)
+    map_y = int(y)
+    delta_x = abs(1 / dir_x) if dir_x != 0 else math.inf
+    delta_y = abs(1 / dir_y) if dir_y != 0 else math.inf
+    if dir_x < 0:
+        step_x = -1
+        side_x = (x - map_x) * delta_x
+    else:
+        step_x = 1
+        side_x = (map_x + 1 - x) * delta_x
+    if dir_y < 0:
+        step_y = -1
+        side_y = (y - map_y) * delta_y
+    else:
+        step_y = 1
+        side_y = (map_y + 1 - y) * delta_y
+    return map_x, map_y, step_x, step_y, side_x, side_y, delta_x, delta_y
+
+
+def enter_cell(x, y, dir_x, dir_y, cell_x, cell_y, max_distance=30):
+    """Return the distance at which the ray enters the cell, ignoring walls, or math.inf.
+
+    This is the same distance the DDA walk reports when it crosses into the
+    cell, computed directly from the cell's bounds.
+    """
+    if dir_x != 0:
+        t1 = (cell_x - x) / dir_x
+        t2 = (cell_x + 1 - x) / dir_x
+        near_x, far_x = (t1, t2) if t1 < t2 else (t2, t1)
+    elif cell_x <= x < cell_x + 1:
+        near_x, far_x = -math.inf, math.inf
+    else:
+        return math.inf
+    if dir_y != 0:
+        t1 = (cell_y - y) / dir_y
+        t2 = (cell_y + 1 - y) / dir_y
+        near_y, far_y = (t1, t2) if t1 < t2 else (t2, t1)
+    elif cell_y <= y < cell_y + 1:
+        near_y, far_y = -math.inf, math.inf
+    else:
+        return math.inf
+    near = near_x if near_x > near_y else near_y
+    far = far_x if far_x < far_y else far_y
+    if near >= far or near <= 0 or near >= max_distance:
+        return math.inf  # Missed, behind the ray, already inside, or too far away
+    return near
+
+
+def cast_ray(maze, x, y, dir_x, dir_y, max_distance=30, layers=()):
+    """Walk the grid cells crossed by a unit-length ray until it hits a wall.
+
+    Every cell along the ray is visited exactly once and the returned distance
+    is the exact distance to the boundary of the hit cell. layers is a list of
+    special cells such as the goal. They are tracked in the same cast and are
+    seen through walls, so the goal tower can rise above the maze. When a layer
+    cell is closer than the wall, the hit kind is HIT_GOAL.
+    """
+    cells = maze.cells
+    width = maze.width
+    height = maze.height
+    map_x, map_y, step_x, step_y, side_x, side_y, delta_x, delta_y = _setup(x, y, dir_x, dir_y)
+    steps = 0
+
+    while True:
+        if side_x < side_y:
+            distance = side_x
+            side_x += delta_x
+            map_x += step_x
+            side = SIDE_X
+        else:
+            distance = side_y
+            side_y += delta_y
+            map_y += step_y
+            side = SIDE_Y
+        steps += 1
+
+        if distance >= max_distance:
+            kind = HIT_NONE
+            distance = max_distance
+            break
+        if map_x < 0 or map_x >= width or map_y < 0 or map_y >= height:
+            kind = HIT_OUT
+            distance = OUT_OF_BOUNDS_DISTANCE
+            break
+        if cells[map_y * width + map_x] & WALL:
+            kind = HIT_WALL
+            break
+
+    if not layers:
+        return RayHit(kind, distance, side, map_x, map_y, steps)
+    layer_distances = [enter_cell(x, y, dir_x, dir_y, cell_x, cell_y, max_distance) for cell_x, cell_y in layers]
+    nearest = min(layer_distances)
+    if nearest < distance:
+        kind = HIT_GOAL
+    return RayHit(kind, distance, side, map_x, map_y, steps, layer_distances)
+
+
+def shade_for(kind, distance):
+    """Return the palette index a column is drawn with, or 0 when nothing is drawn"""
+    if kind == HIT_WALL or kind == HIT_OUT:
+        return 16 + int((min(distance, FAR_DISTANCE) / FAR_DISTANCE) * 16)  # Gradient for walls
+    if kind == HIT_GOAL:
+        return GOAL_COLOR
+    return 0
+
+
+def cast_columns(maze, x, y, angles, max_distance=30, layers=(), counters=None):
+    """Cast one ray per screen column.
+
+    Returns (distances, hit types, shade indices, layer distances) where the
+    first three are arrays with one entry per angle and the last is one such
+    array per layer cell. When counters is given (such as an
+    engine.profiler.Profiler), the cells visited are counted as "ray_steps".
+    engine.batch_raycaster provides the same function on top of NumPy.
+    """
+    return cast_directions(maze, x, y, [math.cos(angle) for angle in angles], [math.sin(angle) for angle in angles],
+                           max_distance, layers, counters)
+
+
+def cast_directions(maze, x, y, dir_xs, dir_ys, max_distance=30, layers=(), counters=None):
+    """cast_columns for rays given as unit direction vectors, such as from engine.camera.Camera"""
+    distances = array("d")
+    kinds = array("b")
+    shades = array("B")
+    layer_distances = [array("d") for _ in layers]
+    steps = 0
+    for dir_x, dir_y in zip(dir_xs, dir_ys):
+        hit = cast_ray(maze, x, y, dir_x, dir_y, max_distance, layers)
+        distances.append(hit.distance)
+        kinds.append(hit.kind)
+        shades.append(shade_for(hit.kind, hit.distance))
+        steps += hit.steps
+        for column_layers, layer_distance in zip(layer_distances, hit.layers):
+            column_layers.append(layer_distance)
+    if counters is not None:
+        counters.count("ray_steps", steps)
+    return distances, kinds, shades, layer_distances
+
+
+def march_ray(maze, x, y, dir_x, dir_y, max_distance=30, step=0.1):
+    """The original fixed-step ray march, kept as a reference for compare_rays"""
+    distance = 0
+    while distance < max_distance:
+        distance += step
+        test_x = int(x + dir_x * distance)
+        test_y = int(y + dir_y * distance)
+        if test_x < 0 or test_x >= maze.width or test_y < 0 or test_y >= maze.height:
+            return OUT_OF_BOUNDS_DISTANCE
+        if maze.is_wall(test_x, test_y):
+            return distance
+    return distance
+
+
+def compare_rays(maze, x, y, angle, columns=128, fov=1.0, tolerance=0.15):
+    """Cast a screen's worth of rays with both engines and return the columns whose
+    wall distances differ by more than tolerance as (column, dda, march) tuples.
+
+    The marcher overshoots by up to one step, and it can slip through the
+    corner where two walls touch diagonally, so small differences are expected.
+    """
+    mismatches = []
+    for column in range(columns):
+        ray_angle = angle - fov / 2 + fov * column / columns
+        dir_x = math.cos(ray_angle)
+        dir_y = math.sin(ray_angle)
+        dda = cast_ray(maze, x, y, dir_x, dir_y).distance
+        march = march_ray(maze, x, y, dir_x, dir_y)
+        if abs(dda - march) > tolerance:
+            mismatches.append((column, dda, march))
+    return mismatches
@@ -0,0 +1,208 @@
+"""Compact replays: the run seed plus the per-tick input stream.
+
+Everything else in a game follows from those two. Stage seeds are drawn from
+the run seed by MazeFactory, and each stage seeds the monsters' random stream
+from its maze seed. A replay file is a fixed header followed by records:
+
+    INPUT  varint tick count, buttons byte, zigzag varint drag_dx
+    CHECK  u32 checksum of the game state before the next tick's input
+    END    outcome byte
+
+Runs of identical input share one INPUT record, so a keyboard player costs a
+few bytes per second. CHECK records every CHECK_INTERVAL ticks let the
+player confirm that a re-simulation stays in step with the original.
+"""
+import struct
+import zlib
+from array import array
+from bisect import bisect_right
+
+from entities.maze_generator import GENERATOR_VERSION
+from .headless import HeadlessGame
+
+MAGIC = b"MZR1"
+HEADER = struct.Struct("<4sHIHHHH")  # magic, generator version, run seed, width, height, trap count, stages
+
+TAG_INPUT = 1
+TAG_CHECK = 2
+TAG_END = 3
+
+OUTCOMES = [None, "gameover", "clear"]
+
+CHECK_INTERVAL = 300  # Ticks between checksums, ten seconds at 30 FPS
+SNAPSHOT_INTERVAL = 600  # Ticks between the snapshots ReplayPlayer keeps for seeking
+
+
+class ReplayMismatch(Exception):
+    """A re-simulated game drifted from the recorded one"""
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def state_checksum(game):
+    """CRC of the parts of the game state that input and monster moves change"""
+    packed = struct.pack("<IIB3d", game.current_stage, game.maze.seed, game.has_key,
+                         game.player.x, game.player.y, game.player.angle)
+    packed += struct.pack(f"<{2 * len(game.monsters)}i", *[c for monster in game.monsters for c in (monster.x, monster.y)])
+    return zlib.crc32(packed)
+
+
+class ReplayRecorder:
+    """Streams a game's input to a binary file object as the game is played"""
+
+    def __init__(self, file, game):
+        self.file = file
+        self.ticks = 0
+        self._run = None  # (buttons, drag_dx) of the run being counted
+        self._count = 0
+        file.write(HEADER.pack(MAGIC, GENERATOR_VERSION, game.run_seed, game.maze.width, game.maze.height,
+                               game.maze_factory.num_traps, game.total_stages))
+
+    def _flush(self):
+        if self._count:
+            buttons, drag_dx = self._run
+            out = bytearray([TAG_INPUT])
+            write_varint(out, self._count)
+            out.append(buttons)
+            write_varint(out, drag_dx * 2 if drag_dx >= 0 else -drag_dx * 2 - 1)
+            self.file.write(out)
+            self._count = 0
+
+    def record(self, game, buttons, drag_dx):
+        """Append one tick's input; called before the input is applied"""
+        if self.ticks % CHECK_INTERVAL == 0:
+            self._flush()
+            self.file.write(bytes([TAG_CHECK]) + struct.pack("<I", state_checksum(game)))
+            self.file.flush()  # So a crash loses at most one interval of input
+        if (buttons, drag_dx) != self._run:
+            self._flush()
+            self._run = (buttons, drag_dx)
+        self._count += 1
+        self.ticks += 1
+
+    def close(self, outcome):
+        self._flush()
+        self.file.write(bytes([TAG_END, OUTCOMES.index(outcome)]))
+        self.file.close()
+
+
+class Replay:
+    """A decoded replay file: header fields, per-tick input and checksums"""
+
+    def __init__(self, data):
+        magic, generator_version, self.seed, self.width, self.height, self.num_traps, self.total_stages = \
+            HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a replay file")
+        if generator_version != GENERATOR_VERSION:
+            raise ValueError(f"replay was recorded with maze generator version {generator_version}")
+        self.buttons = array("B")
+        self.drags = array("i")
+        self.checks = {}  # Tick -> checksum of the state before that tick's input
+        self.outcome = None
+        self.finished = False  # False when the recording was cut off before the game ended
+        pos = HEADER.size
+        while pos < len(data):
+            tag = data[pos]
+            pos += 1
+            if tag == TAG_INPUT:
+                count, pos = read_varint(data, pos)
+                buttons = data[pos]
+                drag, pos = read_varint(data, pos + 1)
+                drag = drag >> 1 if drag & 1 == 0 else -(drag + 1 >> 1)
+                self.buttons.extend([buttons] * count)
+                self.drags.extend([drag] * count)
+            elif tag == TAG_CHECK:
+                self.checks[len(self.buttons)] = struct.unpack_from("<I", data, pos)[0]
+                pos += 4
+            elif tag == TAG_END:
+                self.outcome = OUTCOMES[data[pos]]
+                self.finished = True
+                pos += 1
+            else:
+                raise ValueError(f"unknown replay record {tag} at byte {pos - 1}")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    @property
+    def ticks(self):
+        return len(self.buttons)
+
+
+class ReplayGame(HeadlessGame):
+    """A HeadlessGame whose input comes from a Replay, verifying checksums on the way"""
+
+    def __init__(self, replay, verify=True):
+        self.replay = replay
+        self.verify = verify
+        super().__init__(seed=replay.seed, width=replay.width, height=replay.height,
+                         num_traps=replay.num_traps, total_stages=replay.total_stages)
+
+    def read_input(self):
+        tick = self.tick
+        if self.verify and tick in self.replay.checks and state_checksum(self) != self.replay.checks[tick]:
+            raise ReplayMismatch(f"state differs from the recording at tick {tick}")
+        if tick >= self.replay.ticks:
+            return 0, 0
+        return self.replay.buttons[tick], self.replay.drags[tick]
+
+
+class ReplayPlayer:
+    """Re-simulates a Replay at full speed and seeks with periodic snapshots.
+
+    A snapshot is kept every SNAPSHOT_INTERVAL ticks the first time play
+    passes it. seek() restores the nearest snapshot at or before the target
+    and simulates forward from there, so a seek costs at most one interval of
+    ticks once that part of the replay has been played.
+    """
+
+    def __init__(self, replay, verify=True):
+        self.replay = replay
+        self.game = ReplayGame(replay, verify)
+        self.snapshot_ticks = [0]
+        self.snapshots = [self.game.snapshot()]
+
+    def _advance(self, tick):
+        game = self.game
+        while game.tick < tick and game.outcome is None:
+            game.step()
+            if game.tick % SNAPSHOT_INTERVAL == 0 and game.tick > self.snapshot_ticks[-1]:
+                self.snapshot_ticks.append(game.tick)
+                self.snapshots.append(game.snapshot())
+
+    def seek(self, tick):
+        """Put the game in the state it had before tick's input; returns the game"""
+        tick = max(0, min(tick, self.replay.ticks))
+        nearest = bisect_right(self.snapshot_ticks, tick) - 1
+        if tick < self.game.tick or self.snapshot_ticks[nearest] > self.game.tick:
+            self.game.restore(self.snapshots[nearest])
+        self._advance(tick)
+        return self.game
+
+    def play(self):
+        """Run to the end of the recording and check the outcome; returns the outcome"""
+        game = self.game
+        self._advance(self.replay.ticks)
+        if game.verify and self.replay.finished and (game.outcome, game.tick) != (self.replay.outcome, self.replay.ticks):
+            raise ReplayMismatch(f"replay ended with {game.outcome!r} at tick {game.tick}, "
+                                 f"recorded {self.replay.outcome!r} at tick {self.replay.ticks}")
+        return game.outcome
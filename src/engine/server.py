@@ -0,0 +1,371 @@
+"""An authoritative tick server that runs many games in one asyncio event loop.
+
+Each session is a Simulation driven by the input frames its client sends and
+answered with delta-compressed state. Clients and server talk over
+connections with a send()/poll()/recv() interface; LoopbackConnection
+provides one in-process, so the whole exchange runs without a network.
+
+Messages from the client are INPUT frames. Messages from the server are a
+HEADER (tick, flags) followed by the fields whose flag is set, in flag order:
+
+    FLAG_STAGE     u8 stage, u32 maze seed
+    FLAG_PLAYER    u16 x, u16 y in 1/256 cells, u16 angle in 1/65536 turns
+    FLAG_MONSTERS  u8 count, then count (u8 index, u16 x, u16 y)
+    FLAG_KEY       u8 has_key
+    FLAG_ACK       u32 sequence number of the last input frame applied
+    FLAG_OUTCOME   u8 index into engine.replay.OUTCOMES
+
+Only fields that changed since the last message are sent, only monsters
+that moved are listed, and a tick where nothing changed sends nothing.
+"""
+import asyncio
+import math
+import random
+import struct
+import time
+from collections import OrderedDict, deque
+
+from entities.maze import Maze
+from .flow_field import FlowField
+from .maze_factory import Stage, build_stage
+from .replay import OUTCOMES
+from .simulation import Simulation, CHASE_RADIUS
+
+INPUT = struct.Struct("<IBh")  # sequence number, buttons, drag_dx
+HEADER = struct.Struct("<IB")  # tick, flags
+STAGE = struct.Struct("<BI")
+PLAYER = struct.Struct("<HHH")
+MONSTER = struct.Struct("<BHH")
+
+FLAG_STAGE = 1
+FLAG_PLAYER = 2
+FLAG_MONSTERS = 4
+FLAG_KEY = 8
+FLAG_ACK = 16
+FLAG_OUTCOME = 32
+
+MAX_INPUT_BACKLOG = 8  # Input frames queued per session before the oldest are dropped
+MAX_LAG_TICKS = 5  # Ticks the server may fall behind before it skips them instead of catching up
+
+
+def quantize_player(player):
+    """The player's position and heading as sent in FLAG_PLAYER"""
+    return (round(player.x * 256), round(player.y * 256),
+            round(player.angle % math.tau / math.tau * 65536) & 0xFFFF)
+
+
+class LoopbackConnection:
+    """One end of an in-process connection that delivers whole messages in order.
+
+    Stands in for a socket: loopback_pair() links two ends, send() queues a
+    message on the peer without blocking, and the peer reads it with poll()
+    or await recv(). Closing either end closes both; messages already
+    delivered can still be read, and later sends are dropped.
+    """
+
+    def __init__(self):
+        self.peer = None
+        self.inbox = deque()
+        self.closed = False
+        self.bytes_sent = 0
+        self._waiter = None
+
+    def send(self, data):
+        if self.closed:
+            return
+        self.bytes_sent += len(data)
+        self.peer.inbox.append(bytes(data))
+        self.peer._wake()
+
+    def poll(self):
+        """Return every message received so far without waiting"""
+        messages = list(self.inbox)
+        self.inbox.clear()
+        return messages
+
+    async def recv(self):
+        """Wait for the next message; returns None once the connection is closed and drained"""
+        while not self.inbox:
+            if self.closed:
+                return None
+            self._waiter = asyncio.get_running_loop().create_future()
+            await self._waiter
+            self._waiter = None
+        return self.inbox.popleft()
+
+    def close(self):
+        for end in (self, self.peer):
+            end.closed = True
+            end._wake()
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+
+def loopback_pair():
+    """Return two connected LoopbackConnection ends"""
+    a = LoopbackConnection()
+    b = LoopbackConnection()
+    a.peer = b
+    b.peer = a
+    return a, b
+
+
+class SharedStages:
+    """Stages built once per seed and shared read-only by every session that plays them.
+
+    Sessions started with the same seed draw the same stage seeds, so they
+    play the same mazes without a copy each. Only the most recently used
+    capacity stages are kept for new sessions; sessions still playing an
+    older stage keep their reference to it.
+    """
+
+    def __init__(self, width=31, height=31, num_traps=10, capacity=64):
+        self.width = width
+        self.height = height
+        self.num_traps = num_traps
+        self.capacity = capacity
+        self.stages = OrderedDict()  # Stage seed -> Stage
+
+    def get(self, seed):
+        stage = self.stages.get(seed)
+        if stage is None:
+            stage = self.stages[seed] = build_stage(self.width, self.height, self.num_traps, seed)
+            if len(self.stages) > self.capacity:
+                self.stages.popitem(last=False)
+        else:
+            self.stages.move_to_end(seed)
+        return stage
+
+
+class StageSequence:
+    """A session's run of stages, taken from SharedStages in place of a MazeFactory"""
+
+    def __init__(self, shared):
+        self.shared = shared
+        self.num_traps = shared.num_traps
+        self.seeds = random.Random()
+
+    def reseed(self, seed=None):
+        self.seeds = random.Random(seed)
+
+    def take(self):
+        stage = self.shared.get(self.seeds.getrandbits(32))
+        return Stage(stage.maze, stage.traps, stage.key)  # Its own monster random stream over the shared maze
+
+    def pump(self):
+        pass
+
+
+class ServerSession(Simulation):
+    """One client's game on the server.
+
+    Plays by the same rules, and with the same seed and input the same game,
+    as HeadlessGame, but never writes to the shared maze: the key flag is
+    left in place, and a wall the player has to be freed from after a trap
+    reset is opened in a private copy of the maze.
+    """
+
+    def __init__(self, connection, stages, seed=None, total_stages=3):
+        super().__init__(seed, stages.width, stages.height, stages.num_traps, total_stages,
+                         factory=StageSequence(stages))
+        self.connection = connection
+        self.inputs = deque(maxlen=MAX_INPUT_BACKLOG)  # (sequence, buttons, drag_dx) not yet applied
+        self.buttons = 0
+        self.ack = 0
+        self.dropped_frames = 0  # Frames that were not a whole INPUT frame
+        self.sent_stage = None
+        self.sent_player = None
+        self.sent_monsters = []
+        self.sent_key = None
+        self.sent_ack = None
+        self.sent_outcome = None
+        self.new_game()
+
+    def receive(self):
+        for message in self.connection.poll():
+            if len(message) != INPUT.size:
+                self.dropped_frames += 1  # Malformed; dropped so it cannot end the tick for every session
+                continue
+            self.inputs.append(INPUT.unpack(message))
+
+    def read_input(self):
+        if not self.inputs:
+            return self.buttons, 0  # No frame arrived in time; keep holding the last buttons
+        self.ack, self.buttons, drag_dx = self.inputs.popleft()
+        return self.buttons, drag_dx
+
+    def ensure_player_start_position(self):
+        x = int(self.player.x)
+        y = int(self.player.y)
+        if self.maze.is_wall(x, y):
+            self.maze = Maze(self.maze.width, self.maze.height, self.maze.seed, cells=self.maze.cells)
+            self.flow_field = FlowField(self.maze, CHASE_RADIUS)
+            self.maze.set_empty(x, y)
+
+    def check_key_collision(self):
+        if not self.has_key and int(self.player.x) == self.key[0] and int(self.player.y) == self.key[1]:
+            self.has_key = True
+            self.entities.remove(self.key, *self.key)
+
+    def delta(self):
+        """Encode what changed since the last call, or return None when nothing did"""
+        flags = 0
+        out = bytearray()
+        stage = (self.current_stage, self.maze.seed)
+        if stage != self.sent_stage:
+            flags |= FLAG_STAGE
+            out += STAGE.pack(*stage)
+            self.sent_stage = stage
+        player = quantize_player(self.player)
+        if player != self.sent_player:
+            flags |= FLAG_PLAYER
+            out += PLAYER.pack(*player)
+            self.sent_player = player
+        monsters = [(monster.x, monster.y) for monster in self.monsters]
+        sent = self.sent_monsters
+        moved = [i for i, position in enumerate(monsters) if i >= len(sent) or sent[i] != position]
+        if moved:
+            flags |= FLAG_MONSTERS
+            out.append(len(moved))
+            for i in moved:
+                out += MONSTER.pack(i, *monsters[i])
+            self.sent_monsters = monsters
+        if self.has_key != self.sent_key:
+            flags |= FLAG_KEY
+            out.append(self.has_key)
+            self.sent_key = self.has_key
+        if self.ack != self.sent_ack:
+            flags |= FLAG_ACK
+            out += struct.pack("<I", self.ack)
+            self.sent_ack = self.ack
+        if self.outcome != self.sent_outcome:
+            flags |= FLAG_OUTCOME
+            out.append(OUTCOMES.index(self.outcome))
+            self.sent_outcome = self.outcome
+        if not flags:
+            return None
+        return HEADER.pack(self.tick, flags) + out
+
+
+class TickServer:
+    """Steps every session once per tick at a fixed rate inside one asyncio event loop.
+
+    A tick reads each session's pending input frames, steps its game and
+    sends it a delta. A session whose game ends is sent its outcome and
+    closed; one whose client closed the connection is dropped.
+    """
+
+    def __init__(self, tick_rate=30, width=31, height=31, num_traps=10, total_stages=3):
+        self.tick_rate = tick_rate
+        self.total_stages = total_stages
+        self.stages = SharedStages(width, height, num_traps)
+        self.sessions = []
+        self.ticks = 0
+        self.busy = 0.0  # Seconds spent in tick(), to measure load
+        self.skipped_ticks = 0  # Ticks dropped because the server fell behind
+
+    def connect(self, seed=None):
+        """Start a session on a new loopback connection; returns the client's end"""
+        client_end, server_end = loopback_pair()
+        self.sessions.append(ServerSession(server_end, self.stages, seed, self.total_stages))
+        return client_end
+
+    def tick(self):
+        start = time.perf_counter()
+        running = []
+        for session in self.sessions:
+            if session.connection.closed:
+                continue
+            session.receive()
+            session.step()
+            message = session.delta()
+            if message is not None:
+                session.connection.send(message)
+            if session.outcome is None:
+                running.append(session)
+            else:
+                session.connection.close()
+        self.sessions = running
+        self.ticks += 1
+        self.busy += time.perf_counter() - start
+
+    async def run(self, ticks=None):
+        """Tick at tick_rate, for ticks ticks or until cancelled"""
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        deadline = loop.time()
+        count = 0
+        while ticks is None or count < ticks:
+            self.tick()
+            count += 1
+            deadline += interval
+            lag = loop.time() - deadline
+            if lag > MAX_LAG_TICKS * interval:
+                skipped = int(lag / interval)
+                self.skipped_ticks += skipped
+                deadline += skipped * interval
+            await asyncio.sleep(max(0.0, deadline - loop.time()))  # Sleeps at least a turn so clients run
+
+
+class GameClient:
+    """The client's side of a session: sends input frames and mirrors the state from the deltas"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.sequence = 0
+        self.tick = 0
+        self.stage = None
+        self.maze_seed = None
+        self.player = None  # (x, y, angle)
+        self.monsters = []
+        self.has_key = False
+        self.ack = 0
+        self.outcome = None
+
+    def send_input(self, buttons, drag_dx=0):
+        self.sequence += 1
+        self.connection.send(INPUT.pack(self.sequence, buttons, drag_dx))
+
+    def apply(self, message):
+        self.tick, flags = HEADER.unpack_from(message)
+        pos = HEADER.size
+        if flags & FLAG_STAGE:
+            self.stage, self.maze_seed = STAGE.unpack_from(message, pos)
+            pos += STAGE.size
+        if flags & FLAG_PLAYER:
+            x, y, angle = PLAYER.unpack_from(message, pos)
+            self.player = (x / 256, y / 256, angle / 65536 * math.tau)
+            pos += PLAYER.size
+        if flags & FLAG_MONSTERS:
+            count = message[pos]
+            pos += 1
+            for _ in range(count):
+                i, x, y = MONSTER.unpack_from(message, pos)
+                pos += MONSTER.size
+                if i >= len(self.monsters):
+                    self.monsters.extend([None] * (i + 1 - len(self.monsters)))
+                self.monsters[i] = (x, y)
+        if flags & FLAG_KEY:
+            self.has_key = bool(message[pos])
+            pos += 1
+        if flags & FLAG_ACK:
+            self.ack = struct.unpack_from("<I", message, pos)[0]
+            pos += 4
+        if flags & FLAG_OUTCOME:
+            self.outcome = OUTCOMES[message[pos]]
+
+    def poll(self):
+        """Apply every delta received so far; returns False once the session has ended"""
+        for message in self.connection.poll():
+            self.apply(message)
+        return not self.connection.closed
+
+    async def receive(self):
+        """Wait for and apply the next delta; returns False once the session has ended"""
+        message = await self.connection.recv()
+        if message is None:
+            return False
+        self.apply(message)
+        return True
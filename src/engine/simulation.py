@@ -0,0 +1,272 @@
+import math
+import random
+
+from entities.monster import Monster
+from entities.player import Player
+from entities.trap import Trap
+from entities.maze import Maze, KEY
+from .maze_factory import MazeFactory
+from .maze_cache import MazeCache
+from .flow_field import FlowField
+from .spatial_hash import SpatialHash
+
+# Input bits for one tick, as returned by Simulation.read_input
+BUTTON_UP = 1
+BUTTON_DOWN = 2
+BUTTON_LEFT = 4
+BUTTON_RIGHT = 8
+
+DRAG_TURN = 0.02  # Radians per pixel of horizontal mouse drag
+
+# Sound numbers passed to play_sound
+SOUND_MONSTER = 0
+SOUND_TRAP = 1
+SOUND_KEY = 2
+
+CHASE_RADIUS = 8  # Monsters within this many steps of the player move toward it
+
+
+class Simulation:
+    """The game rules with no dependency on pyxel.
+
+    Input comes from read_input() and sounds go to play_sound(), so the rules
+    can run without a window. AdventureGame adds pyxel input, sound and drawing
+    on top, and engine.headless.HeadlessGame drives it from an action stream.
+    """
+
+    def __init__(self, seed=None, width=31, height=31, num_traps=10, total_stages=3, prebuild=1, threaded=True, cache=None,
+                 factory=None, lazy=False):
+        self.seed = seed  # Fixed seeds replay the same stages on every new game
+        self.run_seed = self.next_run_seed()  # Seed of the current game's stage sequence, recorded by replays
+        self.next_seed = None  # Run seed the factory was reseeded with when the last game ended
+        if factory is not None:
+            # Anything with MazeFactory's take(), reseed() and seeds, such as engine.server.StageSequence
+            factory.reseed(self.run_seed)
+            self.maze_factory = factory
+        else:
+            self.maze_factory = MazeFactory(width, height, num_traps, prebuild, threaded, self.run_seed,
+                                            cache if cache is not None else MazeCache(), lazy)
+        self.started = False  # Until the first new_game, which uses the stages the factory is already building
+        self.current_stage = 1  # Track the current stage
+        self.total_stages = total_stages
+        self.outcome = None  # "gameover" or "clear" once the game has ended
+        self.tick = 0
+        self.recorder = None  # engine.replay.ReplayRecorder while a game is being recorded
+
+    def read_input(self):
+        """Return (buttons, drag_dx) for this tick: BUTTON_* bits and horizontal mouse drag in pixels"""
+        return 0, 0
+
+    def play_sound(self, channel, sound):
+        pass
+
+    def game_over(self):
+        self.outcome = "gameover"
+        self.stop_recording()
+        self.prepare_next_game()
+
+    def game_clear(self):
+        self.outcome = "clear"
+        self.stop_recording()
+        self.prepare_next_game()
+
+    def prepare_next_game(self):
+        """Reseed the factory for the next game now, so its first stage builds while the end screen shows"""
+        self.next_seed = self.next_run_seed()
+        self.maze_factory.reseed(self.next_seed)
+
+    def start_recording(self, file):
+        """Stream this game's input to a binary file object from the next tick on"""
+        from .replay import ReplayRecorder  # Imported here; engine.replay builds on this module
+        self.stop_recording()
+        self.recorder = ReplayRecorder(file, self)
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close(self.outcome)
+            self.recorder = None
+
+    def step(self):
+        """Advance the rules by one tick; GameState.update calls this once per frame"""
+        self.update_player()
+        self.update_monsters()
+        self.check_collisions()
+        self.tick += 1
+
+    def new_game(self):
+        """Start again from stage 1, as TitleState does"""
+        self.current_stage = 1
+        self.outcome = None
+        self.stop_recording()
+        if self.next_seed is not None:
+            self.run_seed = self.next_seed  # The factory has been building this run since the last game ended
+            self.next_seed = None
+        elif self.started:
+            self.run_seed = self.next_run_seed()  # Restarted mid-game
+            self.maze_factory.reseed(self.run_seed)
+        self.started = True
+        self.reset_game()
+
+    def next_run_seed(self):
+        return self.seed if self.seed is not None else random.getrandbits(32)
+
+    def reset_game(self):
+        self.load_stage(self.maze_factory.take())  # Swap in a maze built ahead of time
+        self.goal_x = self.maze.width - 2
+        self.goal_y = self.maze.height - 2
+        self.player = Player(1.5, 1.5, math.pi / 2)
+        self.monsters = [Monster(self.maze.width - 3, self.maze.height - 3),
+                         Monster(self.maze.width - 5, self.maze.height - 3),
+                         Monster(self.maze.width - 3, self.maze.height - 5)]
+        self.monster_move_timer = 0
+        self.index_entities()
+        self.ensure_player_start_position()
+
+    def ensure_player_start_position(self):
+        self.maze.set_empty(int(self.player.x), int(self.player.y))
+
+    def index_entities(self):
+        """Rebuild the spatial index from the current monsters, traps and key"""
+        self.entities = SpatialHash()
+        for entity in self.monsters + self.traps:
+            self.entities.add(entity, entity.x, entity.y)
+        if not self.has_key:
+            self.entities.add(self.key, *self.key)
+
+    def entities_in_view(self):
+        """Yield (x, y, entity) for the monsters, traps and key the player may be able to see"""
+        x = int(self.player.x)
+        y = int(self.player.y)
+        visibility = self.maze.visibility
+        reach = visibility.reach
+        for entity_x, entity_y, entity in self.entities.window(x - reach, y - reach, x + reach, y + reach):
+            if visibility.can_see(x, y, entity_x, entity_y):
+                yield entity_x, entity_y, entity
+
+    def snapshot(self):
+        """Capture the game state for restore(), as ReplayPlayer does for seeking.
+
+        Stages built ahead of time are not captured, so this is only exact for
+        games with prebuild=0, such as HeadlessGame.
+        """
+        return {
+            "tick": self.tick, "current_stage": self.current_stage, "outcome": self.outcome,
+            "maze": (self.maze.width, self.maze.height, self.maze.seed, bytes(self.maze.cells)),
+            "traps": [(trap.x, trap.y) for trap in self.traps], "key": self.key, "has_key": self.has_key,
+            "random": self.random.getstate(), "stage_seeds": self.maze_factory.seeds.getstate(),
+            "player": (self.player.x, self.player.y, self.player.angle),
+            "monsters": [(monster.x, monster.y) for monster in self.monsters],
+            "monster_move_timer": self.monster_move_timer,
+        }
+
+    def restore(self, state):
+        self.tick = state["tick"]
+        self.current_stage = state["current_stage"]
+        self.outcome = state["outcome"]
+        self.maze = Maze(*state["maze"][:3], cells=state["maze"][3])
+        self.goal_x = self.maze.width - 2
+        self.goal_y = self.maze.height - 2
+        self.traps = [Trap(x, y) for x, y in state["traps"]]
+        self.key = state["key"]
+        self.has_key = state["has_key"]
+        self.random = random.Random()
+        self.random.setstate(state["random"])
+        self.flow_field = FlowField(self.maze, CHASE_RADIUS)
+        self.maze_factory.seeds.setstate(state["stage_seeds"])
+        self.next_seed = None  # The seed stream is back mid-run, so a new game reseeds from scratch
+        self.player = Player(*state["player"])
+        self.monsters = [Monster(x, y) for x, y in state["monsters"]]
+        self.monster_move_timer = state["monster_move_timer"]
+        self.index_entities()
+
+    def load_stage(self, stage):
+        self.maze = stage.maze
+        self.traps = stage.traps
+        self.key = stage.key
+        self.random = stage.random
+        self.flow_field = FlowField(self.maze, CHASE_RADIUS)
+        self.has_key = False
+
+    def update_monsters(self):
+        if self.monster_move_timer >= 90:  # Move monsters every 90 frames (1.5 seconds at 60 FPS)
+            self.flow_field.update(int(self.player.x), int(self.player.y))  # No-op unless the player changed cell
+            for monster in self.monsters:
+                old_x, old_y = monster.x, monster.y
+                monster.move(self.maze.grid, self.random, self.flow_field)
+                self.entities.move(monster, old_x, old_y, monster.x, monster.y)
+                self.play_sound(0, SOUND_MONSTER)
+
+            self.monster_move_timer = 0  # Reset the timer
+        self.monster_move_timer += 1
+
+    def check_collision(self):
+        for monster in self.entities.at(int(self.player.x), int(self.player.y)):
+            if isinstance(monster, Monster):
+                self.play_sound(1, SOUND_TRAP)  # Sound for trap collision
+                self.game_over()
+                return
+
+    def check_key_collision(self):
+        if not self.has_key and int(self.player.x) == self.key[0] and int(self.player.y) == self.key[1]:
+            self.has_key = True
+            self.maze.clear_flag(*self.key, KEY)
+            self.entities.remove(self.key, *self.key)
+            self.play_sound(2, SOUND_KEY)  # Sound for collecting the key
+
+    def check_trap_collision(self):
+        for trap in self.entities.at(int(self.player.x), int(self.player.y)):
+            if isinstance(trap, Trap):
+                self.play_sound(1, SOUND_TRAP)  # Sound for trap collision
+                return True
+        return False
+
+    def move_player(self, speed):
+        old_x = self.player.x
+        old_y = self.player.y
+        cos_angle, sin_angle = self.player.direction()
+        new_x = self.player.x + cos_angle * speed
+        new_y = self.player.y + sin_angle * speed
+
+        if not self.maze.is_wall(int(self.player.x), int(new_y)):
+            self.player.y = new_y
+        else:
+            self.player.x += cos_angle * speed * 0.1
+
+        if not self.maze.is_wall(int(new_x), int(self.player.y)):
+            self.player.x = new_x
+        else:
+            self.player.y += sin_angle * speed * 0.1
+
+        if self.maze.is_wall(int(self.player.x), int(self.player.y)):
+            self.player.x = old_x
+            self.player.y = old_y
+
+    def update_player(self):
+        buttons, drag_dx = self.read_input()
+        if self.recorder is not None:
+            self.recorder.record(self, buttons, drag_dx)
+        self.player.angle += drag_dx * DRAG_TURN
+
+        if buttons & BUTTON_LEFT:
+            self.player.angle -= 0.1
+        if buttons & BUTTON_RIGHT:
+            self.player.angle += 0.1
+        if buttons & BUTTON_UP:
+            self.move_player(0.1)
+        elif buttons & BUTTON_DOWN:
+            self.move_player(-0.1)
+        self.maze.ensure_generated(int(self.player.x), int(self.player.y))  # Grow lazily generated mazes
+
+    def check_collisions(self):
+        self.check_collision()
+        self.check_key_collision()
+        if self.check_trap_collision():
+            self.load_stage(self.maze_factory.take())  # Swap in a maze built ahead of time
+            self.index_entities()
+            self.ensure_player_start_position()
+        if self.has_key and int(self.player.x) == self.goal_x and int(self.player.y) == self.goal_y:
+            if self.current_stage < self.total_stages:
+                self.current_stage += 1
+                self.reset_game()
+            else:
+                self.game_clear()
@@ -0,0 +1,43 @@
+class SpatialHash:
+    """Entities bucketed by the maze cell they stand on.
+
+    Monsters, traps and the key all live in one index, so "what is on this
+    cell" is a single dict lookup and a window query only visits occupied
+    cells. Whoever moves an entity calls move() with its old cell.
+    """
+
+    def __init__(self):
+        self.cells = {}  # (x, y) -> list of entities on that cell
+
+    def add(self, entity, x, y):
+        self.cells.setdefault((x, y), []).append(entity)
+
+    def remove(self, entity, x, y):
+        bucket = self.cells.get((x, y))
+        if bucket and entity in bucket:
+            bucket.remove(entity)
+            if not bucket:
+                del self.cells[(x, y)]
+
+    def move(self, entity, old_x, old_y, x, y):
+        if (old_x, old_y) != (x, y):
+            self.remove(entity, old_x, old_y)
+            self.add(entity, x, y)
+
+    def at(self, x, y):
+        """Entities on cell (x, y)"""
+        return self.cells.get((x, y), ())
+
+    def window(self, x0, y0, x1, y1):
+        """Yield (x, y, entity) for every entity with x0 <= x <= x1 and y0 <= y <= y1"""
+        if (x1 - x0 + 1) * (y1 - y0 + 1) < len(self.cells):
+            # Small window over a crowded index: probe each cell in it
+            for y in range(y0, y1 + 1):
+                for x in range(x0, x1 + 1):
+                    for entity in self.cells.get((x, y), ()):
+                        yield x, y, entity
+        else:
+            for (x, y), bucket in self.cells.items():
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    for entity in bucket:
+                        yield x, y, entity
@@ -0,0 +1,50 @@
+import math
+
+
+def project_sprites(camera, x, y, cos_angle, sin_angle, sprites, depths, screen_height):
+    """Clip billboards against the walls already drawn and return the columns to fill.
+
+    sprites is an iterable of (sprite_x, sprite_y, size, color) with size in
+    cells; each stands on the floor and is drawn as an ellipse size cells
+    wide and tall. depths is the per-column z-buffer from the wall pass, as
+    returned by camera.depths, so sprites need no rays of their own: a
+    sprite column is kept only where it is nearer than the wall in that
+    column. Sprites behind the player or off screen are dropped before any
+    column work, and the rest are sorted far to near so nearer ones are drawn
+    over farther ones.
+
+    Returns a list of (column, top, bottom, color) spans in drawing order.
+    """
+    columns = camera.columns
+    half_fov = camera.fov / 2
+    on_screen = []
+    for sprite_x, sprite_y, size, color in sprites:
+        dx = sprite_x - x
+        dy = sprite_y - y
+        forward = dx * cos_angle + dy * sin_angle
+        if forward <= 0.1:
+            continue  # Behind the player, or too close to project
+        distance = math.hypot(dx, dy)
+        angle = math.atan2(dy * cos_angle - dx * sin_angle, forward)
+        half_angle = math.atan2(size / 2, distance)
+        if angle + half_angle < -half_fov or angle - half_angle > half_fov:
+            continue
+        depth = forward if camera.correct_fisheye else distance  # Measured the way the walls were
+        on_screen.append((depth, angle, half_angle, size, color))
+    on_screen.sort(reverse=True)
+
+    spans = []
+    for depth, angle, half_angle, size, color in on_screen:
+        center = (angle / camera.fov + 0.5) * columns
+        half_width = half_angle / camera.fov * columns
+        half_height = screen_height * size / depth
+        middle = screen_height / 2 + screen_height / depth - half_height
+        for column in range(max(0, math.ceil(center - half_width)), min(columns, math.floor(center + half_width) + 1)):
+            if depth >= depths[column]:
+                continue  # Hidden behind the wall in this column
+            u = (column - center) / half_width
+            if u * u >= 1:
+                continue
+            extent = half_height * math.sqrt(1 - u * u)
+            spans.append((column, int(middle - extent), int(middle + extent), color))
+    return spans
@@ -0,0 +1,58 @@
+import pyxel
+
+MINIMAP_REGION = 64  # Cells per side of the pre-rendered minimap texture (64 * 4 px fills an image bank)
+
+
+class FloorLayer:
+    """The cleared screen and striped floor, rendered once and copied with a single blt.
+
+    The stripes match the wall columns drawn at the given ray stride.
+    """
+
+    def __init__(self, width, height, stride=2, color=3):
+        self.image = pyxel.Image(width, height)
+        self.image.cls(0)
+        for ray in range(0, width, stride):
+            self.image.rect(ray, height // 2, max(1, stride // 2), height - height // 2, color)
+
+    def draw(self):
+        pyxel.blt(0, 0, self.image, 0, 0, self.image.width, self.image.height)
+
+
+class MinimapLayer:
+    """Walls of the maze around the player pre-rendered at map scale.
+
+    The texture covers up to MINIMAP_REGION cells per side, which is the whole
+    maze for normal stages. It is redrawn only when the maze is swapped, its
+    walls change (maze.version), or the player walks out of the covered region
+    on a larger maze. Each frame the visible window is one blt.
+    """
+
+    def __init__(self, scale):
+        self.scale = scale
+        self.image = pyxel.Image(MINIMAP_REGION * scale, MINIMAP_REGION * scale)
+        self.key = None  # (maze, version, origin_x, origin_y) the texture was rendered for
+
+    def _render(self, maze, origin_x, origin_y):
+        scale = self.scale
+        self.image.cls(0)
+        for y in range(origin_y, min(maze.height, origin_y + MINIMAP_REGION)):
+            for x in range(origin_x, min(maze.width, origin_x + MINIMAP_REGION)):
+                if maze.is_wall(x, y):
+                    self.image.rect((x - origin_x) * scale, (y - origin_y) * scale, scale, scale, 7)
+        self.key = (maze, maze.version, origin_x, origin_y)
+
+    def draw(self, maze, x0, y0, x1, y1, screen_x, screen_y):
+        """Copy cells x0 <= x < x1, y0 <= y < y1 to the screen with (x0, y0) at (screen_x, screen_y)"""
+        if x1 <= x0 or y1 <= y0:
+            return
+        key = self.key
+        if (key is None or key[0] is not maze or key[1] != maze.version
+                or not (key[2] <= x0 and x1 <= key[2] + MINIMAP_REGION and key[3] <= y0 and y1 <= key[3] + MINIMAP_REGION)):
+            # Centre a new region on the window, kept inside the maze
+            origin_x = max(0, min(maze.width - MINIMAP_REGION, (x0 + x1 - MINIMAP_REGION) // 2))
+            origin_y = max(0, min(maze.height - MINIMAP_REGION, (y0 + y1 - MINIMAP_REGION) // 2))
+            self._render(maze, origin_x, origin_y)
+        scale = self.scale
+        pyxel.blt(screen_x, screen_y, self.image, (x0 - self.key[2]) * scale, (y0 - self.key[3]) * scale,
+                  (x1 - x0) * scale, (y1 - y0) * scale)
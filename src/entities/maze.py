@@ -1,59 +1,217 @@
 import random
+from array import array
+
+from .maze_generator import ChunkedGenerator, CHUNK_SIZE, WALL
+from .maze_visibility import VisibilitySets
+
+# Cell flags stored in Maze.cells, alongside WALL
+GOAL = 2
+TRAP = 4
+KEY = 8
+
+OCCUPIED = WALL | TRAP | KEY  # Cells with any of these flags are not in the free-cell index
+
+
+class MazeRow:
+    """One row of a GridView; reads 1 for walls and 0 for open cells"""
+    __slots__ = ("cells", "start", "width")
+
+    def __init__(self, cells, start, width):
+        self.cells = cells
+        self.start = start
+        self.width = width
+
+    def __getitem__(self, x):
+        return self.cells[self.start + x] & WALL
+
+    def __len__(self):
+        return self.width
+
+    def __iter__(self):
+        for x in range(self.width):
+            yield self.cells[self.start + x] & WALL
+
+
+class GridView:
+    """Read-only list-of-lists style access to Maze.cells, so grid[y][x] == 1 still means a wall.
+
+    Write through Maze.set_empty and Maze.set_flag so the free-cell index stays current.
+    """
+
+    def __init__(self, maze):
+        self.maze = maze
+
+    def __getitem__(self, y):
+        if y < 0:
+            y += self.maze.height
+        return MazeRow(self.maze.cells, y * self.maze.width, self.maze.width)
+
+    def __len__(self):
+        return self.maze.height
+
+    def __iter__(self):
+        for y in range(self.maze.height):
+            yield self[y]
+
+
+class SparseIndex(dict):
+    """Cell index -> int map that stands in for a full-size array("i") on lazily generated mazes.
+
+    Only cells that were written take memory; every other cell reads -1.
+    """
+
+    def __missing__(self, i):
+        return -1
+
 
 class Maze:
-    def __init__(self, width, height):
+    def __init__(self, width, height, seed=None, lazy=False, chunk_size=CHUNK_SIZE, cells=None, deferred=False):
         self.width = width
         self.height = height
-        self.grid = self._generate_maze()
-
-    def _generate_maze(self):
-        maze = [[1 for _ in range(self.width)] for _ in range(self.height)]
-        stack = [(1, 1)]
-        visited = set()
-
-        while stack:
-            x, y = stack[-1]
-            visited.add((x, y))
-            maze[y][x] = 0
-
-            neighbors = []
-            for dx, dy in [(0, -2), (2, 0), (0, 2), (-2, 0)]:
-                nx, ny = x + dx, y + dy
-                if 0 < nx < self.width-1 and 0 < ny < self.height-1 and (nx, ny) not in visited:
-                    neighbors.append((nx, ny, x + dx//2, y + dy//2))
-
-            if neighbors:
-                nx, ny, wx, wy = random.choice(neighbors)
-                maze[wy][wx] = 0
-                stack.append((nx, ny))
-            else:
-                stack.pop()
-
-        maze[1][1] = 0
-        maze[self.height - 2][self.width - 2] = 0
-
-        wall_count = random.randint(3,5)
-
-        # Randomly set some walls to empty spaces
-        for y in range(1, self.height-1):
-            for x in range(1, self.width-1):
-                if maze[y][x] == 1:
-                    if random.randint(0,6) < wall_count:
-                        directions = [(0, -1), (1, 0), (0, 1), (-1, 0)]
-                        random.shuffle(directions)
-                        for dx, dy in directions:
-                            nx, ny = x + dx, y + dy
-                            if 0 < nx < self.width-1 and 0 < ny < self.height-1 and maze[ny][nx] == 1:
-                                maze[ny][nx] = 0
-                                break
-
-        return maze
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.random = random.Random(self.seed)  # Drives generation and placement, so a seed reproduces the layout
+        self.grid = GridView(self)
+        self.version = 0  # Bumped whenever walls change, so caches built from the layout know to rebuild
+        self.visibility = VisibilitySets(self)  # Which cells may be seen from which, for culling sprites
+        self.lazy = lazy and cells is None
+        self._free = array("i")
+        self._free_pos = SparseIndex() if self.lazy else array("i", [-1]) * (width * height)  # Cell -> index in _free
+        if cells is not None:
+            # Restore a maze generated earlier, e.g. from engine.maze_cache
+            self.cells = bytearray(cells)
+            self.generator = None
+            self._index_region(1, 1, width - 1, height - 1)
+            return
+
+        self.cells = bytearray([WALL]) * (width * height)  # Row-major cell flags, one byte per cell
+        self.generator = ChunkedGenerator(width, height, chunk_size, self.random)
+        if lazy:
+            # Build the chunks around the start and the goal now and the rest as the player approaches
+            self.ensure_generated(1, 1, 0)
+            self.ensure_generated(width - 2, height - 2, 0)
+        elif not deferred:
+            self.ensure_generated(width // 2, height // 2, max(width, height))
+        # Otherwise nothing is carved yet and the caller runs generate_steps()
+
+    @property
+    def buffer(self):
+        """A memoryview of the cells that NumPy can wrap without copying"""
+        return memoryview(self.cells)
+
+    def index(self, x, y):
+        return y * self.width + x
+
+    def ensure_generated(self, x, y, radius=CHUNK_SIZE):
+        """Generate any chunks within radius cells of (x, y) that do not exist yet"""
+        if self.generator is None or not self.generator.remaining:
+            return
+        for bounds in self.generator.generate_around(self.cells, x, y, radius):
+            self._chunk_generated(*bounds)
+
+    def generate_steps(self):
+        """Generate every remaining chunk, yielding between slices of the work.
+
+        The same maze as eager generation, built in small steps so that
+        MazeFactory.pump() can spread it over several frames.
+        """
+        generator = self.generator
+        for chunk_y in range(generator.chunks_y):
+            for chunk_x in range(generator.chunks_x):  # Row by row, the order generate_around uses
+                if not generator.generated[chunk_y * generator.chunks_x + chunk_x]:
+                    yield from generator.carve_chunk(self.cells, chunk_x, chunk_y)
+                    self._chunk_generated(*generator.chunk_bounds(chunk_x, chunk_y))
+                    yield
+
+    def _chunk_generated(self, x0, y0, x1, y1):
+        if x0 <= 1 < x1 and y0 <= 1 < y1:
+            self.cells[self.index(1, 1)] = 0
+        if x0 <= self.width - 2 < x1 and y0 <= self.height - 2 < y1:
+            self.cells[self.index(self.width - 2, self.height - 2)] = GOAL
+        self._index_region(x0, y0, x1, y1)
+        self.version += 1
+
+    def _index_region(self, x0, y0, x1, y1):
+        """Add the free cells of a newly generated region to the free-cell index.
+
+        The index is a swap-remove array plus each cell's position in it.
+        """
+        cells = self.cells
+        for y in range(y0, y1):
+            for i in range(y * self.width + x0, y * self.width + x1):
+                if not cells[i] & OCCUPIED:
+                    self._free_pos[i] = len(self._free)
+                    self._free.append(i)
+
+    def _update_free(self, i):
+        """Add or remove cell i from the free-cell index after its flags changed"""
+        x = i % self.width
+        y = i // self.width
+        if not (0 < x < self.width - 1 and 0 < y < self.height - 1):
+            return
+        pos = self._free_pos[i]
+        if self.cells[i] & OCCUPIED:
+            if pos >= 0:
+                last = self._free.pop()
+                if last != i:
+                    self._free[pos] = last
+                    self._free_pos[last] = pos
+                self._free_pos[i] = -1
+        elif pos < 0:
+            self._free_pos[i] = len(self._free)
+            self._free.append(i)
+
+    def _swap_free(self, a, b):
+        free = self._free
+        free[a], free[b] = free[b], free[a]
+        self._free_pos[free[a]] = a
+        self._free_pos[free[b]] = b
 
     def is_wall(self, x, y):
-        return self.grid[y][x] == 1
+        return self.cells[y * self.width + x] & WALL != 0
+
+    def has_flag(self, x, y, flag):
+        return self.cells[y * self.width + x] & flag != 0
+
+    def set_flag(self, x, y, flag):
+        i = y * self.width + x
+        old = self.cells[i]
+        self.cells[i] |= flag
+        if flag & OCCUPIED:
+            self._update_free(i)
+        if (old ^ self.cells[i]) & WALL:
+            self.version += 1
+
+    def clear_flag(self, x, y, flag):
+        i = y * self.width + x
+        old = self.cells[i]
+        self.cells[i] &= ~flag & 0xFF
+        if flag & OCCUPIED:
+            self._update_free(i)
+        if (old ^ self.cells[i]) & WALL:
+            self.version += 1  # Only when a wall really changed, so set_empty on an open cell keeps the caches
+            self.visibility.wall_opened(x, y)
 
     def set_empty(self, x, y):
-        self.grid[y][x] = 0
+        self.clear_flag(x, y, WALL)
 
     def get_empty_cells(self):
-        return [(x, y) for y in range(1, self.height - 1) for x in range(1, self.width - 1) if self.grid[y][x] == 0]
\ No newline at end of file
+        """Return the open interior cells that hold no trap or key"""
+        width = self.width
+        return [(i % width, i // width) for i in self._free]
+
+    def random_empty_cell(self, rng=None):
+        """Return a random free cell in O(1), or None when there is none"""
+        rng = rng or self.random
+        if not self._free:
+            return None
+        i = self._free[rng.randrange(len(self._free))]
+        return i % self.width, i // self.width
+
+    def sample_empty_cells(self, count, rng=None):
+        """Return up to count distinct random free cells without scanning the grid"""
+        rng = rng or self.random
+        count = min(count, len(self._free))
+        for n in range(count):
+            self._swap_free(n, rng.randrange(n, len(self._free)))  # Partial Fisher-Yates shuffle
+        width = self.width
+        return [(i % width, i // width) for i in self._free[:count]]
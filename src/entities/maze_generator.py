@@ -0,0 +1,169 @@
+import random
+from array import array
+
+WALL = 1
+
+GENERATOR_VERSION = 2  # Bump whenever the same seed would produce a different maze
+
+CHUNK_SIZE = 64  # Cells per chunk side; even so every chunk starts on an odd (carvable) coordinate
+CARVE_SLICE = 64  # Backtracker steps between the points where carve_chunk yields
+
+
+class ChunkedGenerator:
+    """Generates a maze chunk by chunk so large mazes can be built lazily.
+
+    The maze is split into CHUNK_SIZE x CHUNK_SIZE regions. Each region is carved
+    as its own perfect maze, and the regions are joined through one door per edge
+    of a spanning tree over the chunk grid, so the whole maze stays connected.
+    Every chunk has its own seed and only writes inside its own bounds, so the
+    result does not depend on the order in which chunks are generated.
+    """
+
+    def __init__(self, width, height, chunk_size=CHUNK_SIZE, rng=random):
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.chunks_x = max(1, (width - 2 + chunk_size - 1) // chunk_size)
+        self.chunks_y = max(1, (height - 2 + chunk_size - 1) // chunk_size)
+        self.seed = rng.getrandbits(64)
+        self.generated = bytearray(self.chunks_x * self.chunks_y)
+        self.remaining = self.chunks_x * self.chunks_y
+        self.doors = self._place_doors(rng)
+
+    def chunk_bounds(self, chunk_x, chunk_y):
+        """Return the cell range (x0, y0, x1, y1) a chunk owns, end exclusive"""
+        x0 = 1 + chunk_x * self.chunk_size
+        y0 = 1 + chunk_y * self.chunk_size
+        return x0, y0, min(x0 + self.chunk_size, self.width - 1), min(y0 + self.chunk_size, self.height - 1)
+
+    def chunk_at(self, x, y):
+        chunk_x = min(max(x - 1, 0) // self.chunk_size, self.chunks_x - 1)
+        chunk_y = min(max(y - 1, 0) // self.chunk_size, self.chunks_y - 1)
+        return chunk_x, chunk_y
+
+    def _place_doors(self, rng):
+        """Pick a spanning tree over the chunk grid and a door cell for each of its edges.
+
+        Returns chunk index -> door cell indices. A door always lies on the right or
+        bottom wall of the chunk that owns it.
+        """
+        doors = {}
+        count = self.chunks_x * self.chunks_y
+        if count == 1:
+            return doors
+        visited = bytearray(count)
+        stack = array("i", [0])
+        visited[0] = 1
+        while stack:
+            chunk = stack[-1]
+            chunk_x, chunk_y = chunk % self.chunks_x, chunk // self.chunks_x
+            neighbors = []
+            for dx, dy in [(0, -1), (1, 0), (0, 1), (-1, 0)]:
+                nx, ny = chunk_x + dx, chunk_y + dy
+                if 0 <= nx < self.chunks_x and 0 <= ny < self.chunks_y and not visited[ny * self.chunks_x + nx]:
+                    neighbors.append((nx, ny))
+            if not neighbors:
+                stack.pop()
+                continue
+            nx, ny = rng.choice(neighbors)
+            visited[ny * self.chunks_x + nx] = 1
+            stack.append(ny * self.chunks_x + nx)
+
+            # The door belongs to whichever of the two chunks is up or to the left
+            owner_x, owner_y = min(chunk_x, nx), min(chunk_y, ny)
+            x0, y0, x1, y1 = self.chunk_bounds(owner_x, owner_y)
+            if nx != chunk_x:
+                door = (x1 - 1, y0 + 2 * rng.randrange((y1 - y0 + 1) // 2))  # Odd rows; a 1-cell chunk still has one
+            else:
+                door = (x0 + 2 * rng.randrange((x1 - x0 + 1) // 2), y1 - 1)
+            doors.setdefault(owner_y * self.chunks_x + owner_x, []).append(door[1] * self.width + door[0])
+        return doors
+
+    def generate_chunk(self, cells, chunk_x, chunk_y):
+        """Carve one chunk into cells; returns False if it was already generated"""
+        if self.generated[chunk_y * self.chunks_x + chunk_x]:
+            return False
+        for _ in self.carve_chunk(cells, chunk_x, chunk_y):
+            pass
+        return True
+
+    def carve_chunk(self, cells, chunk_x, chunk_y):
+        """generate_chunk as a generator that yields between slices of the work.
+
+        Each slice is CARVE_SLICE backtracker steps or one row of the
+        wall-opening pass, so a caller with a time budget can stop after any
+        slice and resume later. Does nothing if the chunk was already generated.
+        """
+        chunk = chunk_y * self.chunks_x + chunk_x
+        if self.generated[chunk]:
+            return
+        self.generated[chunk] = 1
+        self.remaining -= 1
+
+        rng = random.Random(self.seed * 1000003 + chunk)
+        width = self.width
+        x0, y0, x1, y1 = self.chunk_bounds(chunk_x, chunk_y)
+
+        # Recursive backtracker over the odd cells. An odd cell has been visited
+        # exactly when it is open, so the cells themselves are the visited bitmap.
+        start = y0 * width + x0
+        cells[start] = 0
+        stack = array("i", [start])
+        steps = 0
+        while stack:
+            steps += 1
+            if steps % CARVE_SLICE == 0:
+                yield
+            i = stack[-1]
+            x, y = i % width, i // width
+            neighbors = []
+            if y - 2 >= y0 and cells[i - 2 * width]:
+                neighbors.append(-width)
+            if x + 2 < x1 and cells[i + 2]:
+                neighbors.append(1)
+            if y + 2 < y1 and cells[i + 2 * width]:
+                neighbors.append(width)
+            if x - 2 >= x0 and cells[i - 2]:
+                neighbors.append(-1)
+
+            if neighbors:
+                step = rng.choice(neighbors)
+                cells[i + step] = 0
+                cells[i + 2 * step] = 0
+                stack.append(i + 2 * step)
+            else:
+                stack.pop()
+
+        for door in self.doors.get(chunk, ()):
+            cells[door] = 0
+
+        wall_count = rng.randint(3, 5)
+
+        # Randomly set some walls to empty spaces
+        directions = [-width, 1, width, -1]
+        for y in range(y0, y1):
+            yield
+            for i in range(y * width + x0, y * width + x1):
+                if cells[i] == WALL:
+                    if rng.randint(0, 6) < wall_count:
+                        rng.shuffle(directions)
+                        for step in directions:
+                            n = i + step
+                            nx, ny = n % width, n // width
+                            if x0 <= nx < x1 and y0 <= ny < y1 and cells[n] == WALL:
+                                cells[n] = 0
+                                break
+
+    def generate_around(self, cells, x, y, radius):
+        """Generate every chunk that overlaps the square of the given radius around (x, y).
+
+        Returns the bounds (x0, y0, x1, y1) of each chunk generated by this call.
+        """
+        first_x, first_y = self.chunk_at(x - radius, y - radius)
+        last_x, last_y = self.chunk_at(x + radius, y + radius)
+        generated = []
+        for chunk_y in range(first_y, last_y + 1):
+            for chunk_x in range(first_x, last_x + 1):
+                if self.generate_chunk(cells, chunk_x, chunk_y):
+                    generated.append(self.chunk_bounds(chunk_x, chunk_y))
+        return generated
@@ -0,0 +1,135 @@
+import math
+
+from .maze_generator import WALL
+
+
+class VisibilitySets:
+    """Potentially visible cells (PVS) of the open cells of a maze.
+
+    Nothing farther than max_distance is visible, so a cell's set covers
+    only the square of cells within that range around it: bit
+    (y - cy + reach) * span + (x - cx + reach) is set when open cell (x, y)
+    may be seen from somewhere inside cell (cx, cy). Sets are conservative:
+    a pair of cells is only left out when no line between them can get past
+    the walls (see _crossings). can_see answers a pair directly from the
+    walls, a few microseconds each, unless visible() has already built that
+    cell's set. A wall opened by set_empty afterwards only adds lines of
+    sight, so the sets are kept and can_see tests the pairs they leave out
+    against the current walls; any other change to maze.version, such as a
+    lazily generated chunk, drops them all.
+    """
+
+    def __init__(self, maze, max_distance=30):
+        self.maze = maze
+        self.max_distance = max_distance
+        self.reach = math.ceil(max_distance) + 1  # Cells from the centre to the edge of a set's square
+        self.span = 2 * self.reach + 1
+        self.sets = {}  # Cell index -> bitset, for the cells visible() was asked about
+        self.opened = set()  # Indexes of the cells opened since the sets were computed
+        self.version = maze.version
+
+    def wall_opened(self, x, y):
+        """Called by Maze once it has opened the wall at (x, y) and bumped its version"""
+        self.opened.add(y * self.maze.width + x)
+        if self.version == self.maze.version - 1:
+            self.version = self.maze.version  # Nothing else changed, so the sets still hold
+
+    def _check_version(self):
+        if self.version != self.maze.version:
+            self.sets.clear()
+            self.opened.clear()
+            self.version = self.maze.version
+
+    def visible(self, x, y):
+        """Bitset of the cells potentially visible from cell (x, y), laid out as described above"""
+        self._check_version()
+        index = y * self.maze.width + x
+        entry = self.sets.get(index)
+        if entry is None:
+            entry = self.sets[index] = self._compute(x, y)
+        return entry
+
+    def can_see(self, x, y, target_x, target_y):
+        """True if cell (target_x, target_y) may be visible from cell (x, y)"""
+        dx = target_x - x + self.reach
+        dy = target_y - y + self.reach
+        if not (0 <= dx < self.span and 0 <= dy < self.span):
+            return False
+        self._check_version()
+        index = y * self.maze.width + x
+        entry = self.sets.get(index)
+        if entry is None or index in self.opened:
+            return self._sees(x, y, target_x, target_y)
+        if entry >> (dy * self.span + dx) & 1:
+            return True
+        return bool(self.opened) and self._sees(x, y, target_x, target_y)
+
+    def _compute(self, cell_x, cell_y):
+        reach = self.reach
+        span = self.span
+        bits = 1 << (reach * span + reach)
+        for y in range(max(0, cell_y - reach), min(self.maze.height, cell_y + reach + 1)):
+            for x in range(max(0, cell_x - reach), min(self.maze.width, cell_x + reach + 1)):
+                if (x, y) != (cell_x, cell_y) and self._sees(cell_x, cell_y, x, y):
+                    bits |= 1 << ((y - cell_y + reach) * span + x - cell_x + reach)
+        return bits
+
+    def _sees(self, x, y, target_x, target_y):
+        """True if open cell (target_x, target_y) is in range of cell (x, y) and not hidden by the walls"""
+        cells = self.maze.cells
+        width = self.maze.width
+        gap_x = max(0, abs(target_x - x) - 1)
+        gap_y = max(0, abs(target_y - y) - 1)
+        # Nearest points of the two cells, the shortest any ray between them can be
+        if gap_x * gap_x + gap_y * gap_y >= self.max_distance * self.max_distance:
+            return False
+        if cells[target_y * width + target_x] & WALL:
+            return False
+        points, edges = _crossings(target_x - x, target_y - y)
+        for ox, oy in points:
+            if cells[(y + oy) * width + x + ox] & WALL:
+                return False
+        for ox, oy, ox2, oy2 in edges:
+            if cells[(y + oy) * width + x + ox] & WALL and cells[(y + oy2) * width + x + ox2] & WALL:
+                return False
+        return True
+
+
+_crossing_cache = {}
+
+
+def _crossings(dx, dy):
+    """Walls that hide a cell dx, dy away: returns (points, edges) as offsets from the first cell.
+
+    Any line from anywhere in one cell to anywhere in the other stays within
+    half a cell, on both axes, of the line between the two cells' centres.
+    So the centre line is tested against the walls shrunk by half a cell on
+    every side, which leaves the centres of wall cells and the segments
+    joining the centres of adjacent wall cells. If it touches one, every
+    line between the cells hits a wall there, and the cells cannot see each
+    other. points are the cells whose centre the line passes through; edges
+    are pairs of adjacent cells whose centres' segment it crosses, blocking
+    only if both are walls. All of it is exact on the grid of centres.
+    """
+    entry = _crossing_cache.get((dx, dy))
+    if entry is not None:
+        return entry
+    points = []
+    edges = []
+    steps = math.gcd(dx, dy)
+    for k in range(1, steps):
+        points.append((k * dx // steps, k * dy // steps))
+    step = 1 if dy > 0 else -1
+    for y in range(step, dy, step):
+        x, rem = divmod(y * dx, dy)  # Crossing row y between the centres of cells x and x + 1
+        if rem:
+            edges.append((x, y, x + 1, y))
+    step = 1 if dx > 0 else -1
+    for x in range(step, dx, step):
+        y, rem = divmod(x * dy, dx)  # Crossing column x between the centres of cells y and y + 1
+        if rem:
+            edges.append((x, y, x, y + 1))
+    # Nearest the first cell first, where most lines are stopped
+    edges.sort(key=lambda edge: abs(edge[0]) + abs(edge[1]))
+    entry = _crossing_cache[dx, dy] = (points, edges)
+    return entry
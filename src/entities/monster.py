@@ -1,18 +1,27 @@
 import random
 
 class Monster:
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
 
-    def move(self, maze):
+    def move(self, maze, rng=random, flow=None):
+        # Chase the player when a shared flow field says it is within range
+        if flow is not None:
+            step = flow.next_step(self.x, self.y, rng)
+            if step is not None:
+                self.x, self.y = step
+                return
+
         possible_moves = []
         for dx, dy in [(0, -1), (1, 0), (0, 1), (-1, 0)]:
             nx, ny = self.x + dx, self.y + dy
             if maze[ny][nx] == 0:
                 possible_moves.append((nx, ny))
         if possible_moves:
-            self.x, self.y = random.choice(possible_moves)
+            self.x, self.y = rng.choice(possible_moves)
 
     def collides_with(self, player):
         return int(self.x) == int(player.x) and int(self.y) == int(player.y)
\ No newline at end of file
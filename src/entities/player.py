@@ -1,10 +1,21 @@
 import math
 
 class Player:
+    __slots__ = ("x", "y", "angle", "_direction_angle", "_direction")
+
     def __init__(self, x, y, angle):
         self.x = x
         self.y = y
         self.angle = angle
+        self._direction_angle = None
+        self._direction = (1.0, 0.0)
+
+    def direction(self):
+        """(cos, sin) of the heading, recomputed only after the angle changes"""
+        if self._direction_angle != self.angle:
+            self._direction_angle = self.angle
+            self._direction = (math.cos(self.angle), math.sin(self.angle))
+        return self._direction
 
     def move(self, maze, speed):
         new_x = self.x + math.cos(self.angle) * speed
@@ -5,9 +5,7 @@ class GameState:
         self.game = game
 
     def update(self):
-        self.game.update_player()
-        self.game.update_monsters()
-        self.game.check_collisions()
+        self.game.step()
 
     def draw(self):
         self.game.draw_maze()
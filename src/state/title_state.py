@@ -1,5 +1,4 @@
 import pyxel
-from .game_state import GameState
 
 class TitleState:
     def __init__(self, game):
@@ -7,8 +6,7 @@ class TitleState:
 
     def update(self):
         if pyxel.btnp(pyxel.KEY_SPACE) or pyxel.btnp(pyxel.MOUSE_BUTTON_LEFT) or pyxel.btnp(pyxel.GAMEPAD1_BUTTON_START):
-            self.game.reset_game()
-            self.game.state = GameState(self.game)
+            self.game.start()  # Loads the game the first time, see main.Launcher
 
     def draw(self):
         pyxel.cls(0)
@@ -0,0 +1,55 @@
+"""Play many seeded games with a pathfinding bot across a process pool.
+
+Usage: python tools/batch_sim.py [games] [workers] [output.jsonl] [first-seed] [max-ticks]
+
+Each game's result is appended to the JSONL file as soon as it finishes, and only
+running per-stage totals are kept in memory. The summary is printed at the end.
+"""
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from engine.batch import play_game, BatchStats
+
+IN_FLIGHT_PER_WORKER = 4  # Games queued per worker; bounds memory for very large runs
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    output = sys.argv[3] if len(sys.argv) > 3 else "batch_results.jsonl"
+    first_seed = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    max_ticks = int(sys.argv[5]) if len(sys.argv) > 5 else 20000
+
+    stats = BatchStats()
+    seeds = iter(range(first_seed, first_seed + games))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as executor, open(output, "w") as f:
+        pending = set()
+        while True:
+            for seed in seeds:
+                pending.add(executor.submit(play_game, seed, max_ticks))
+                if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                f.write(json.dumps(result) + "\n")
+                stats.add(result)
+    elapsed = time.perf_counter() - start
+
+    summary = stats.summary()
+    summary["seconds"] = elapsed
+    summary["games_per_second"] = games / elapsed
+    summary["workers"] = workers
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Compare the DDA raycaster against the original fixed-step ray march.
+
+Usage: python tools/compare_raycast.py [mazes] [poses-per-maze] [tolerance]
+"""
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from entities.maze import Maze
+from engine.raycaster import compare_rays
+
+
+def main():
+    mazes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    poses = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    tolerance = float(sys.argv[3]) if len(sys.argv) > 3 else 0.15
+
+    rays = 0
+    mismatches = []
+    for _ in range(mazes):
+        maze = Maze(31, 31)
+        empty_cells = maze.get_empty_cells()
+        for _ in range(poses):
+            cell_x, cell_y = random.choice(empty_cells)
+            x = cell_x + random.uniform(0.05, 0.95)
+            y = cell_y + random.uniform(0.05, 0.95)
+            angle = random.uniform(0, 2 * math.pi)
+            for column, dda, march in compare_rays(maze, x, y, angle, tolerance=tolerance):
+                mismatches.append((x, y, angle, column, dda, march))
+            rays += 128
+
+    print(f"rays: {rays}  mismatches: {len(mismatches)} ({100 * len(mismatches) / rays:.2f}%)")
+    for x, y, angle, column, dda, march in mismatches[:10]:
+        print(f"  pos=({x:.3f}, {y:.3f}) angle={angle:.3f} column={column} dda={dda:.3f} march={march:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Record, verify and seek replays from the command line.
+
+Usage:
+    python tools/replay.py record out.mzr [seed] [max-ticks]
+    python tools/replay.py play replay.mzr [seek-tick ...]
+
+record plays a seeded game with the pathfinding bot and saves its replay.
+play re-simulates a replay at full speed, checking every recorded checksum
+and the outcome, then times a seek to each given tick.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from engine.bot import PathBot
+from engine.headless import HeadlessGame
+from engine.replay import Replay, ReplayPlayer
+
+
+def record(path, seed, max_ticks):
+    game = HeadlessGame(seed=seed)
+    game.actions = PathBot(game)
+    game.start_recording(open(path, "wb"))
+    outcome = game.run(max_ticks)
+    game.stop_recording()
+    size = os.path.getsize(path)
+    minutes = game.tick / 30 / 60
+    print(f"{outcome or 'timeout'} after {game.tick} ticks; {size} bytes, {size / minutes:.0f} bytes per minute at 30 FPS")
+
+
+def play(path, seeks):
+    replay = Replay.load(path)
+    player = ReplayPlayer(replay)
+    start = time.perf_counter()
+    outcome = player.play()
+    elapsed = time.perf_counter() - start
+    print(f"verified {replay.ticks} ticks and {len(replay.checks)} checksums in {elapsed:.3f}s: {outcome or 'unfinished'}")
+    for tick in seeks:
+        start = time.perf_counter()
+        game = player.seek(tick)
+        elapsed = time.perf_counter() - start
+        print(f"seek to {tick}: {elapsed * 1000:.1f}ms, stage {game.current_stage} player at "
+              f"({game.player.x:.2f}, {game.player.y:.2f})")
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("record", "play"):
+        print(__doc__)
+        sys.exit(2)
+    if sys.argv[1] == "record":
+        seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+        max_ticks = int(sys.argv[4]) if len(sys.argv) > 4 else 20000
+        record(sys.argv[2], seed, max_ticks)
+    else:
+        play(sys.argv[2], [int(tick) for tick in sys.argv[3:]])
+
+
+if __name__ == "__main__":
+    main()
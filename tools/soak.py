@@ -0,0 +1,54 @@
+"""Soak test: play many headless games with random input as fast as the CPU allows.
+
+Usage: python tools/soak.py [games] [max-ticks] [seed] [layouts]
+
+Games cycle through `layouts` distinct seeds that share one maze cache, so
+after the first round the run measures the rules rather than maze generation.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from engine.headless import HeadlessGame
+from engine.maze_cache import MazeCache
+from engine.simulation import BUTTON_UP, BUTTON_DOWN, BUTTON_LEFT, BUTTON_RIGHT
+
+
+def random_actions(rng):
+    """Hold a random mix of buttons for a random number of ticks, forever"""
+    while True:
+        buttons = rng.choice([BUTTON_UP, BUTTON_UP, BUTTON_UP | BUTTON_LEFT, BUTTON_UP | BUTTON_RIGHT,
+                              BUTTON_LEFT, BUTTON_RIGHT, BUTTON_DOWN, 0])
+        for _ in range(rng.randint(1, 30)):
+            yield buttons
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    max_ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    layouts = int(sys.argv[4]) if len(sys.argv) > 4 else 64
+
+    cache = MazeCache(capacity=layouts * 4)  # Room for every stage of every layout
+
+    outcomes = {}
+    ticks = 0
+    start = time.perf_counter()
+    for game in range(games):
+        rng = random.Random(seed + game)
+        sim = HeadlessGame(random_actions(rng), seed=seed + game % layouts, cache=cache)
+        outcome = sim.run(max_ticks) or "timeout"
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        ticks += sim.tick
+    elapsed = time.perf_counter() - start
+
+    print(f"games: {games}  ticks: {ticks}  {games / elapsed:.0f} games/s  {ticks / elapsed:.0f} ticks/s")
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome}: {count}")
+
+
+if __name__ == "__main__":
+    main()